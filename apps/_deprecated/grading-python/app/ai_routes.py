@@ -1,29 +1,106 @@
-import json
-import re
+import asyncio
+from collections.abc import AsyncIterator, Callable
 from typing import Literal
 
 from fastapi import APIRouter
-from pydantic import BaseModel, ConfigDict, Field
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
 
-from app.llm import complete
+from app import passage_cache
+from app.config import settings
+from app.json_extract import ArrayItemScanner, parse_model
+from app.llm import M, complete_model, complete_stream
 from app.logger import logger
 
 
+PARAPHRASE_VERSION = "paraphrase-v1"
+EXPLAIN_VERSION = "explain-v1"
 
-def extract_json(text: str) -> dict:
-    """Extract JSON object from LLM response, stripping markdown fences if present."""
-    match = re.search(r"```(?:json)?\s*({.*?})\s*```", text, re.DOTALL)
-    if match:
-        return json.loads(match.group(1))
-    match = re.search(r"({.*})", text, re.DOTALL)
-    if match:
-        return json.loads(match.group(1))
-    return json.loads(text)
+
+async def _complete(prompt: str, cache_version: str, model: type[M]) -> M:
+    """Call LLM and validate the response into model."""
+    return await complete_model(
+        [{"role": "user", "content": prompt}], model, cache_version=cache_version
+    )
 
 
-async def _complete(prompt: str) -> str:
-    """Call LLM and collect response."""
-    return await complete([{"role": "user", "content": prompt}])
+async def _respond(
+    kind: str,
+    version: str,
+    req: BaseModel,
+    prompt: Callable[[BaseModel], str],
+    model: type[M],
+) -> tuple[M, bool]:
+    """Serve from the passage cache or call the LLM and fill it. Returns (result, hit)."""
+    from app.main import get_redis
+
+    redis = await get_redis()
+    key = passage_cache.cache_key(kind, version, req)
+    cached = await passage_cache.get(redis, key)
+    if cached is not None:
+        return model.model_validate_json(cached), True
+    result = await _complete(prompt(req), version, model)
+    await passage_cache.put(redis, key, result.model_dump_json(by_alias=True))
+    return result, False
+
+
+class ErrorEvent(BaseModel):
+    detail: str
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _stream_highlights(
+    kind: str,
+    version: str,
+    req: BaseModel,
+    prompt: Callable[[BaseModel], str],
+    highlight: type[BaseModel],
+    response: type[BaseModel],
+) -> AsyncIterator[str]:
+    """SSE: one `highlight` event per highlights[] element as soon as it closes,
+    then `done` with the full validated response (or `error`).
+    A passage cache hit replays the cached response immediately."""
+    from app.main import get_redis
+
+    redis = await get_redis()
+    key = passage_cache.cache_key(kind, version, req)
+    cached = await passage_cache.get(redis, key)
+    if cached is not None:
+        result = response.model_validate_json(cached)
+        for item in result.highlights:
+            yield _sse("highlight", item.model_dump_json(by_alias=True))
+        yield _sse("done", cached)
+        return
+
+    scanner = ArrayItemScanner("highlights")
+    try:
+        async for delta in complete_stream([{"role": "user", "content": prompt(req)}]):
+            for raw in scanner.feed(delta):
+                try:
+                    item = highlight.model_validate_json(raw)
+                except ValidationError:
+                    continue
+                yield _sse("highlight", item.model_dump_json(by_alias=True))
+        result = parse_model(scanner.text, response)
+    except Exception as e:
+        logger.warning("highlight stream failed", error=str(e), sampled=True)
+        yield _sse("error", ErrorEvent(detail=str(e)).model_dump_json())
+        return
+    body = result.model_dump_json(by_alias=True)
+    await passage_cache.put(redis, key, body)
+    yield _sse("done", body)
+
+
+def _event_stream(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 ai_router = APIRouter()
 
@@ -45,9 +122,7 @@ class ParaphraseResponse(BaseModel):
     highlights: list[HighlightEntry]
 
 
-@ai_router.post("/ai/paraphrase", response_model=ParaphraseResponse)
-async def paraphrase(req: ParaphraseRequest):
-    context_line = f"\nAdditional context: {req.context}" if req.context else ""
+def _paraphrase_prompt(req: ParaphraseRequest) -> str:
     prompt = (
         f"You are a VSTEP English exam tutor. Analyze the following {req.skill} passage "
         f"and identify 5-10 key phrases that can be paraphrased for Vietnamese VSTEP learners.\n"
@@ -59,14 +134,33 @@ async def paraphrase(req: ParaphraseRequest):
     if req.context:
         prompt += f"\nAdditional context: {req.context}"
     prompt += f"\n\nText:\n{req.text}"
+    return prompt
 
-    logger.info("paraphrase request for skill=%s len=%d", req.skill, len(req.text))
-    content = await _complete(prompt)
 
-    result = ParaphraseResponse.model_validate(extract_json(content))
+@ai_router.post("/ai/paraphrase", response_model=ParaphraseResponse)
+async def paraphrase(req: ParaphraseRequest):
+    logger.info("paraphrase request for skill=%s len=%d", req.skill, len(req.text))
+    result, _ = await _respond(
+        "paraphrase", PARAPHRASE_VERSION, req, _paraphrase_prompt, ParaphraseResponse
+    )
     return result
 
 
+@ai_router.post("/ai/paraphrase/stream")
+async def paraphrase_stream(req: ParaphraseRequest):
+    logger.info("paraphrase stream for skill=%s len=%d", req.skill, len(req.text))
+    return _event_stream(
+        _stream_highlights(
+            "paraphrase",
+            PARAPHRASE_VERSION,
+            req,
+            _paraphrase_prompt,
+            HighlightEntry,
+            ParaphraseResponse,
+        )
+    )
+
+
 # --- Explain ---
 
 class ExplainRequest(BaseModel):
@@ -99,8 +193,7 @@ class ExplainResponse(BaseModel):
     question_explanations: list[QuestionExplanation] | None = Field(None, alias="questionExplanations")
 
 
-@ai_router.post("/ai/explain", response_model=ExplainResponse)
-async def explain(req: ExplainRequest):
+def _explain_prompt(req: ExplainRequest) -> str:
     prompt = (
         f"You are a VSTEP English exam tutor. Analyze the following {req.skill} passage.\n"
         f"Identify important grammar structures, vocabulary, discourse markers, and strategies.\n"
@@ -124,9 +217,72 @@ async def explain(req: ExplainRequest):
         prompt += f"- \"questionExplanations\": null\n"
 
     prompt += f"\nText:\n{req.text}"
+    return prompt
 
-    logger.info("explain request for skill=%s len=%d", req.skill, len(req.text))
-    content = await _complete(prompt)
 
-    result = ExplainResponse.model_validate(extract_json(content))
+@ai_router.post("/ai/explain", response_model=ExplainResponse)
+async def explain(req: ExplainRequest):
+    logger.info("explain request for skill=%s len=%d", req.skill, len(req.text))
+    result, _ = await _respond("explain", EXPLAIN_VERSION, req, _explain_prompt, ExplainResponse)
     return result.model_dump(by_alias=True)
+
+
+@ai_router.post("/ai/explain/stream")
+async def explain_stream(req: ExplainRequest):
+    logger.info("explain stream for skill=%s len=%d", req.skill, len(req.text))
+    return _event_stream(
+        _stream_highlights(
+            "explain",
+            EXPLAIN_VERSION,
+            req,
+            _explain_prompt,
+            ExplainHighlight,
+            ExplainResponse,
+        )
+    )
+
+
+# --- Precompute ---
+
+class PrecomputeRequest(BaseModel):
+    """Every tutor request for one exam version, to warm the passage cache."""
+
+    paraphrase: list[ParaphraseRequest] = []
+    explain: list[ExplainRequest] = []
+
+
+class PrecomputeResponse(BaseModel):
+    cached: int
+    computed: int
+    failed: int
+
+
+@ai_router.post("/ai/precompute", response_model=PrecomputeResponse)
+async def precompute(req: PrecomputeRequest):
+    slots = asyncio.Semaphore(settings.passage_precompute_concurrency)
+
+    async def warm(kind: str, version: str, item: BaseModel, prompt, model) -> str:
+        async with slots:
+            try:
+                _, hit = await _respond(kind, version, item, prompt, model)
+            except Exception as e:
+                logger.warning("precompute failed", kind=kind, error=str(e), sampled=True)
+                return "failed"
+        return "cached" if hit else "computed"
+
+    outcomes = await asyncio.gather(
+        *(
+            warm("paraphrase", PARAPHRASE_VERSION, item, _paraphrase_prompt, ParaphraseResponse)
+            for item in req.paraphrase
+        ),
+        *(
+            warm("explain", EXPLAIN_VERSION, item, _explain_prompt, ExplainResponse)
+            for item in req.explain
+        ),
+    )
+    logger.info("precomputed tutor responses", total=len(outcomes))
+    return PrecomputeResponse(
+        cached=outcomes.count("cached"),
+        computed=outcomes.count("computed"),
+        failed=outcomes.count("failed"),
+    )
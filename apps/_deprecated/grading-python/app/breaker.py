@@ -0,0 +1,143 @@
+"""Per-provider circuit breaker.
+
+closed -> open when the error rate over the rolling window reaches the
+threshold (once there are enough samples). open -> half_open after the
+cooldown, where one probe call is let through; its outcome closes the breaker
+or opens it again. Successful calls also feed a latency EWMA and a window of
+recent latencies for percentile lookups; calls abandoned as too slow add their
+elapsed time to that window too.
+"""
+
+import math
+import time
+from collections import deque
+from collections.abc import Callable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        window: float = 60.0,
+        min_requests: int = 5,
+        error_rate: float = 0.5,
+        cooldown: float = 30.0,
+        alpha: float = 0.2,
+        latency_samples: int = 200,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.window = window
+        self.min_requests = min_requests
+        self.threshold = error_rate
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.clock = clock
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+        self.latency_ewma: float | None = None
+        self._outcomes: deque[tuple[float, bool]] = deque()
+        self._latencies: deque[float] = deque(maxlen=latency_samples)
+
+    def available(self) -> bool:
+        """Whether a call would be let through right now. Does not claim the probe."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return self.clock() - self.opened_at >= self.cooldown
+        return not self.probing
+
+    def allow(self) -> bool:
+        """Claim permission for one call; the caller must then record its outcome."""
+        if self.state == OPEN and self.clock() - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+            self.probing = False
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self, latency: float):
+        self.latency_ewma = (
+            latency
+            if self.latency_ewma is None
+            else self.alpha * latency + (1 - self.alpha) * self.latency_ewma
+        )
+        self._latencies.append(latency)
+        if self.state == HALF_OPEN:
+            self._close()
+            return
+        self._add(True)
+
+    def record_latency(self, latency: float):
+        """Add a latency sample without an outcome, e.g. a call cancelled after `latency`.
+
+        Such a sample is a lower bound; leaving it out would hide exactly the
+        slow calls and pull the percentiles down.
+        """
+        self._latencies.append(latency)
+
+    def record_failure(self):
+        if self.state == HALF_OPEN:
+            self._open()
+            return
+        self._add(False)
+        if (
+            self.state == CLOSED
+            and len(self._outcomes) >= self.min_requests
+            and self.error_rate() >= self.threshold
+        ):
+            self._open()
+
+    def release(self):
+        """Give back a claimed probe without an outcome (e.g. the call was cancelled)."""
+        self.probing = False
+
+    def error_rate(self) -> float:
+        self._trim()
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for _, ok in self._outcomes if not ok) / len(self._outcomes)
+
+    def latency_percentile(self, q: float, min_samples: int = 1) -> float | None:
+        """Nearest-rank percentile (q in 0..1) of recent successful call latencies."""
+        if len(self._latencies) < max(min_samples, 1):
+            return None
+        ordered = sorted(self._latencies)
+        rank = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+        return ordered[rank]
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "error_rate": round(self.error_rate(), 3),
+            "requests": len(self._outcomes),
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+        }
+
+    def _add(self, ok: bool):
+        self._outcomes.append((self.clock(), ok))
+        self._trim()
+
+    def _trim(self):
+        horizon = self.clock() - self.window
+        while self._outcomes and self._outcomes[0][0] < horizon:
+            self._outcomes.popleft()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self.probing = False
+
+    def _close(self):
+        self.state = CLOSED
+        self.probing = False
+        self._outcomes.clear()
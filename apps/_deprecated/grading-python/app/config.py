@@ -12,16 +12,69 @@ class Settings(BaseSettings):
     llm_fallback_account_id: str | None = None
     llm_fallback_api_base: str | None = None
     llm_fallback_api_key: str | None = None
+    llm_structured_output: bool = True
+    llm_fallback_structured_output: bool = True
     llm_timeout: int = 60
     llm_retries: int = 3
+    llm_backoff_base: float = 0.5
+    llm_backoff_max: float = 8.0
+    llm_breaker_window: float = 60.0
+    llm_breaker_min_requests: int = 5
+    llm_breaker_error_rate: float = 0.5
+    llm_breaker_cooldown: float = 30.0
+    llm_rate_limit_enabled: bool = False
+    llm_rps: float = 5.0
+    llm_tpm: int = 200_000
+    llm_max_concurrency: int = 16
+    llm_fallback_rps: float = 5.0
+    llm_fallback_tpm: int = 200_000
+    llm_fallback_max_concurrency: int = 16
+    llm_output_tokens_estimate: int = 800
+    llm_hedge_enabled: bool = False
+    llm_hedge_percentile: float = 0.95
+    llm_hedge_min_samples: int = 20
+    llm_hedge_budget_per_minute: int = 30
+    llm_cache_enabled: bool = False
+    llm_cache_ttl: int = 7 * 86400
+    llm_cache_max_entries: int = 50_000
 
     stt_model: str = "cloudflare/@cf/deepgram/nova-3"
     stt_api_base: str | None = None
     stt_api_key: str | None = None
+    stt_concurrency: int = 8
+
+    http_http2: bool = True
+    http_max_connections_per_host: int = 50
+    http_max_keepalive_per_host: int = 20
+    http_keepalive_expiry: float = 60.0
+    http_connect_timeout: float = 10.0
 
     redis_url: str = "redis://localhost:6379"
 
+    passage_cache_ttl: int = 30 * 86400
+    passage_cache_local_size: int = 1024
+    passage_precompute_concurrency: int = 4
+
+    # Duplicate pushes of a task share one grade (see app.idempotency).
+    grade_dedup_enabled: bool = True
+    grade_lock_ttl: int = 600
+    grade_result_ttl: int = 86400
+
+    grade_batch_concurrency: int = 8
+    grade_batch_max_items: int = 100
+
+    worker_enabled: bool = False
+    worker_concurrency: int = 8
+    worker_block_ms: int = 5000
+    worker_claim_idle_ms: int = 300_000
+    worker_max_deliveries: int = 3
+
     log_level: str = "INFO"
+    # Per event name; 0 disables. Errors are never rate limited.
+    log_event_limit: int = 20
+    log_event_window: float = 10.0
+    # Append finished traces here as JSON lines; empty disables export.
+    trace_file: str = ""
 
 
 settings = Settings()
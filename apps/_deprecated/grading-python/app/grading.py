@@ -1,15 +1,36 @@
+import asyncio
+import json
+
 import httpx
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import ValidationError
 from redis.asyncio import Redis
 
-from app import speaking, writing
+from app import idempotency, speaking, tracing, writing
+from app.config import settings
 from app.models import PermanentError, Result, Task
 
 grade_router = APIRouter()
 
+TRANSIENT_STATUS = (408, 429)
+
+# Shared by every batch in this process, so concurrent batches can't multiply load.
+_batch_slots = asyncio.Semaphore(settings.grade_batch_concurrency)
+
 
 async def grade(task: Task, redis: Redis) -> Result:
+    with tracing.span(
+        "grade",
+        trace_id=tracing.trace_id_for(task.submission_id),
+        submission_id=task.submission_id,
+        question_id=task.question_id,
+        skill=task.skill,
+    ):
+        return await idempotency.once(task, redis, lambda: _grade(task, redis))
+
+
+async def _grade(task: Task, redis: Redis) -> Result:
     try:
         if task.skill == "writing":
             return await writing.grade(task)
@@ -17,7 +38,10 @@ async def grade(task: Task, redis: Redis) -> Result:
     except (KeyError, ValidationError) as e:
         raise PermanentError(f"invalid answer payload: {e}") from e
     except httpx.HTTPStatusError as e:
-        if e.response.status_code < 500:
+        # Only the audio download raises this (STT failures are STTError);
+        # a missing or forbidden object won't appear on retry, throttling will.
+        status = e.response.status_code
+        if status < 500 and status not in TRANSIENT_STATUS:
             raise PermanentError(f"audio download failed: {e}") from e
         raise
 
@@ -28,3 +52,47 @@ async def grade_http(task: Task):
 
     redis = await get_redis()
     return await grade(task, redis)
+
+
+async def _grade_item(index: int, item: dict, redis: Redis) -> dict:
+    """Grade one batch entry; failures become an error line instead of failing the batch."""
+    line = {
+        "index": index,
+        "submissionId": item.get("submissionId", item.get("submission_id")),
+        "questionId": item.get("questionId", item.get("question_id")),
+    }
+    try:
+        task = Task.model_validate(item)
+        async with _batch_slots:
+            result = await grade(task, redis)
+        return {**line, "status": "ok", "result": result.model_dump(by_alias=True)}
+    except (ValidationError, PermanentError) as e:
+        return {**line, "status": "failed", "permanent": True, "error": str(e)}
+    except Exception as e:
+        return {**line, "status": "failed", "permanent": False, "error": str(e)}
+
+
+async def _stream_batch(items: list[dict], redis: Redis):
+    jobs = [asyncio.create_task(_grade_item(i, item, redis)) for i, item in enumerate(items)]
+    try:
+        for job in asyncio.as_completed(jobs):
+            yield json.dumps(await job) + "\n"
+    finally:
+        # Client went away: stop grading what nobody will read.
+        for job in jobs:
+            job.cancel()
+
+
+@grade_router.post("/grade/batch")
+async def grade_batch(items: list[dict]):
+    """Grade many tasks at once, streaming one NDJSON line per task as it finishes.
+
+    Lines carry index/submissionId/questionId and either result or error.
+    """
+    if len(items) > settings.grade_batch_max_items:
+        raise HTTPException(413, f"batch exceeds {settings.grade_batch_max_items} items")
+
+    from app.main import get_redis
+
+    redis = await get_redis()
+    return StreamingResponse(_stream_batch(items, redis), media_type="application/x-ndjson")
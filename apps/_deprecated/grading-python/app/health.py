@@ -1,8 +1,27 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from app import http_client, idempotency, llm, llm_cache, passage_cache
+from app.logger import stats as logging_stats
 
 health_router = APIRouter()
 
 
 @health_router.get("/health")
 async def health():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "http": http_client.stats(),
+        "llm": llm.breaker_states(),
+        "llm_hedge": llm.hedge_stats,
+        "llm_parse": llm.parse_stats,
+        "llm_cache": llm_cache.stats,
+        "passage_cache": passage_cache.stats,
+        "grade_dedup": idempotency.stats,
+        "logging": logging_stats,
+    }
+
+
+@health_router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
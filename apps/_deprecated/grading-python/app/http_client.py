@@ -0,0 +1,100 @@
+"""Shared outbound HTTP pool for LLM, STT and audio downloads.
+
+One AsyncClient per process. Every configured upstream host gets its own
+transport so connection limits apply per host; anything else (audio object
+storage) goes through the default transport.
+"""
+
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.config import settings
+
+CLOUDFLARE_API_HOST = "api.cloudflare.com"
+
+_client: httpx.AsyncClient | None = None
+_transports: dict[str, "_Transport"] = {}
+
+
+class _Transport(httpx.AsyncHTTPTransport):
+    """Records how long requests wait before their headers go out (pool wait + connect)."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.wait_count = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+
+        async def trace(event: str, _info: dict):
+            if event.endswith("send_request_headers.started"):
+                waited = (time.perf_counter() - start) * 1000
+                self.wait_count += 1
+                self.wait_total_ms += waited
+                self.wait_max_ms = max(self.wait_max_ms, waited)
+
+        request.extensions["trace"] = trace
+        return await super().handle_async_request(request)
+
+    def stats(self) -> dict:
+        connections = self._pool.connections
+        idle = sum(1 for c in connections if c.is_idle())
+        return {
+            "in_use": len(connections) - idle,
+            "idle": idle,
+            "requests": self.wait_count,
+            "wait_ms_avg": round(self.wait_total_ms / self.wait_count, 2) if self.wait_count else 0.0,
+            "wait_ms_max": round(self.wait_max_ms, 2),
+        }
+
+
+def _new_transport() -> _Transport:
+    return _Transport(
+        http2=settings.http_http2,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections_per_host,
+            max_keepalive_connections=settings.http_max_keepalive_per_host,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+    )
+
+
+def _upstream_hosts() -> set[str]:
+    bases = (settings.llm_api_base, settings.llm_fallback_api_base, settings.stt_api_base)
+    hosts = {urlsplit(base).hostname for base in bases if base}
+    hosts.add(CLOUDFLARE_API_HOST)
+    hosts.discard(None)
+    return hosts
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _transports.clear()
+        _transports["*"] = _new_transport()
+        mounts = {}
+        for host in sorted(_upstream_hosts()):
+            _transports[host] = _new_transport()
+            mounts[f"all://{host}"] = _transports[host]
+        _client = httpx.AsyncClient(
+            transport=_transports["*"],
+            mounts=mounts,
+            timeout=httpx.Timeout(settings.llm_timeout, connect=settings.http_connect_timeout),
+        )
+    return _client
+
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _transports.clear()
+
+
+def stats() -> dict:
+    return {host: transport.stats() for host, transport in _transports.items()}
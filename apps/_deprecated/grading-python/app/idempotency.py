@@ -0,0 +1,150 @@
+"""Grade each (submission, question, answer) once, however often it is pushed.
+
+The backend may re-push a task, e.g. after a timeout, while the first attempt
+is still running. The first caller takes a Redis lock and grades; concurrent
+duplicates subscribe to a per-key channel and pick up the result it stores,
+and late duplicates find that result cached. A PermanentError is only
+published, never stored: duplicates already waiting raise it instead of
+grading again, but a later re-push (say with a freshly signed audio URL, or
+after the LLM returned unparseable output) grades afresh. If the owner fails
+otherwise it publishes that too, and one of the waiters takes the lock and
+grades instead.
+
+The key includes the prompt version, so a template change regrades, and
+ignores presigning parameters on audio URLs, which differ on every re-push.
+If Redis is unavailable the task is simply graded.
+"""
+
+import asyncio
+import hashlib
+import json
+import uuid
+from collections.abc import Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app import metrics
+from app.config import settings
+from app.logger import logger
+from app.models import PermanentError, Result, Task
+from app.prompts import SPEAKING_VERSION, WRITING_VERSION
+from app.stt import unsigned_url
+
+RESULT_PREFIX = "grading:result:"
+LOCK_PREFIX = "grading:lock:"
+CHANNEL_PREFIX = "grading:done:"
+# Published (not stored) when the owner hit a PermanentError; the rest is its message.
+PERMANENT_PREFIX = "permanent:"
+
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+AUDIO_URL_KEYS = ("audioUrl", "audio_url")
+
+stats = {"graded": 0, "cached": 0, "awaited": 0, "takeovers": 0}
+
+
+def task_key(task: Task) -> str:
+    version = WRITING_VERSION if task.skill == "writing" else SPEAKING_VERSION
+    answer = json.dumps(
+        _without_signatures(task.answer), sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    )
+    digest = hashlib.sha256(f"{version}\n{answer}".encode()).hexdigest()
+    return f"{task.submission_id}:{task.question_id}:{digest}"
+
+
+def _without_signatures(value):
+    """value with every audio URL in it stripped of presigning parameters."""
+    if isinstance(value, list):
+        return [_without_signatures(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    out = {}
+    for k, v in value.items():
+        if k in AUDIO_URL_KEYS and isinstance(v, str):
+            out[k] = unsigned_url(v)
+        else:
+            out[k] = _without_signatures(v)
+    return out
+
+
+async def once(task: Task, redis: Redis, run: Callable[[], Awaitable[Result]]) -> Result:
+    """Return the result of run() for this task, sharing it with every duplicate."""
+    if not settings.grade_dedup_enabled:
+        return await run()
+
+    key = task_key(task)
+    token = uuid.uuid4().hex
+    waited = False
+    try:
+        while True:
+            cached = await redis.get(RESULT_PREFIX + key)
+            metrics.cache_lookup("grade_result", "miss" if cached is None else "hit").inc()
+            if cached is not None:
+                stats["awaited" if waited else "cached"] += 1
+                return Result.model_validate_json(cached)
+            lock_ms = settings.grade_lock_ttl * 1000
+            if await redis.set(LOCK_PREFIX + key, token, nx=True, px=lock_ms):
+                break
+            waited = True
+            message = await _wait(redis, key)
+            if message is not None and message.startswith(PERMANENT_PREFIX):
+                raise PermanentError(message.removeprefix(PERMANENT_PREFIX))
+    except RedisError as e:
+        logger.warning(
+            "grading dedup unavailable",
+            submission_id=task.submission_id,
+            error=str(e),
+            sampled=True,
+        )
+        return await run()
+
+    stats["takeovers" if waited else "graded"] += 1
+    try:
+        result = await run()
+    except PermanentError as e:
+        await _finish(redis, key, token, None, PERMANENT_PREFIX + str(e))
+        raise
+    except BaseException:
+        await _finish(redis, key, token, None, "failed")
+        raise
+    await _finish(redis, key, token, result.model_dump_json(by_alias=True), "done")
+    return result
+
+
+async def _wait(redis: Redis, key: str) -> str | None:
+    """Block until the lock holder for key publishes, or its lock expires.
+
+    Returns what the owner published, or None if there was nothing to wait for.
+    """
+    loop = asyncio.get_running_loop()
+    async with redis.pubsub() as pubsub:
+        await pubsub.subscribe(CHANNEL_PREFIX + key)
+        # Subscribing after the owner published would wait for nothing.
+        ttl_ms = await redis.pttl(LOCK_PREFIX + key)
+        if ttl_ms < 0 or await redis.exists(RESULT_PREFIX + key):
+            return None
+        deadline = loop.time() + ttl_ms / 1000
+        while (remaining := deadline - loop.time()) > 0:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None:
+                return message["data"]
+    return None
+
+
+async def _finish(redis: Redis, key: str, token: str, result: str | None, message: str):
+    """Store the serialized result (if any), publish message and release the lock."""
+    try:
+        async with redis.pipeline(transaction=True) as pipe:
+            if result is not None:
+                pipe.set(RESULT_PREFIX + key, result, ex=settings.grade_result_ttl)
+            pipe.publish(CHANNEL_PREFIX + key, message)
+            pipe.eval(_RELEASE_LUA, 1, LOCK_PREFIX + key, token)
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning("grading dedup release failed", error=str(e), sampled=True)
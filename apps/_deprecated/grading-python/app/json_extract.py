@@ -0,0 +1,174 @@
+"""Locate JSON objects in LLM output and validate them straight into models.
+
+Models often wrap JSON in markdown fences or add a sentence around it. Rather
+than regex-matching the whole response, hand Pydantic's JSON parser (which
+builds the model without an intermediate dict) the span from the first "{" to
+the last "}", and if that isn't it, scan once for balanced braces and try each
+complete object. The scan takes each brace and each whole string literal as
+one match of a compiled pattern, so it stays linear and never backtracks, and
+it keeps no stack, so deep nesting is left for the parser to reject.
+"""
+
+import re
+from collections.abc import Iterator
+from typing import TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+M = TypeVar("M", bound=BaseModel)
+
+# A brace, or a whole string literal (escapes included) in one match. The
+# closing quote is captured so an unterminated string shows up as group(1) None;
+# the unrolled [^"\\]*(?:\\.[^"\\]*)* form never backtracks.
+_TOKEN = re.compile(r'[{}]|"[^"\\]*(?:\\.[^"\\]*)*(")?')
+_STRING_END = re.compile(r'["\\]')
+_ITEM_STRUCTURAL = re.compile(r'[{}\[\]"]')
+
+
+def iter_objects(text: str) -> Iterator[tuple[int, int]]:
+    """Yield (start, end) spans of successive complete top-level {...} objects."""
+    start = text.find("{")
+    while start != -1:
+        depth = 0
+        for match in _TOKEN.finditer(text, start):
+            char = match.group()[0]
+            if char == '"':
+                if match.group(1) is None:
+                    return  # unterminated string: nothing after it can close
+            elif char == "{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    yield start, match.end()
+                    break
+        else:
+            return
+        start = text.find("{", match.end())
+
+
+def find_object(text: str) -> str | None:
+    """First complete JSON object in text, or None."""
+    for start, end in iter_objects(text):
+        return text[start:end]
+    return None
+
+
+def parse_model(text: str, model: type[M]) -> M:
+    """Validate the first object in text that fits model.
+
+    Most responses hold one object, maybe fenced or with prose around it, so
+    the span from the first "{" to the last "}" is tried first: one pass of
+    the parser. If that isn't the object, the brace scan finds the candidates.
+    Raises the last ValidationError when no candidate fits, or the error from
+    parsing the raw text when it contains no object at all.
+    """
+    start, end = text.find("{"), text.rfind("}") + 1
+    if 0 <= start < end:
+        try:
+            return model.model_validate_json(text[start:end])
+        except ValidationError:
+            pass
+    error: ValidationError | None = None
+    for start, end in iter_objects(text):
+        try:
+            return model.model_validate_json(text[start:end])
+        except ValidationError as e:
+            error = e
+    if error is not None:
+        raise error
+    return model.model_validate_json(text)
+
+
+class ArrayItemScanner:
+    """Incremental scanner for streamed output.
+
+    Feed text chunks as they arrive; feed() returns the raw JSON of every
+    object element of the top-level array field `key` that closed within the
+    chunk. State carries over between calls and only the unfinished item or
+    key is kept in the working buffer, so the cost per chunk is proportional
+    to the chunk. The full text so far is available as `text` for final
+    validation.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._chunks: list[str] = []
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_key: str | None = None
+        self._in_target = False
+        self._item_start: int | None = None
+
+    @property
+    def text(self) -> str:
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def feed(self, chunk: str) -> list[str]:
+        self._chunks.append(chunk)
+        buffer = self._buffer = self._buffer + chunk
+        items = []
+        pos = self._pos
+        if self._escaped and pos < len(buffer):
+            self._escaped = False
+            pos += 1
+        while True:
+            if self._in_string:
+                match = _STRING_END.search(buffer, pos)
+                if match is None:
+                    break
+                pos = match.end()
+                if match.group() == "\\":
+                    if pos == len(buffer):
+                        self._escaped = True
+                        break
+                    pos += 1
+                    continue
+                self._in_string = False
+                if self._depth == 1:
+                    self._last_key = buffer[self._string_start + 1 : pos - 1]
+                continue
+            match = _ITEM_STRUCTURAL.search(buffer, pos)
+            if match is None:
+                break
+            char = match.group()
+            i = match.start()
+            pos = match.end()
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char == "{" or char == "[":
+                self._depth += 1
+                if self._depth == 2:
+                    self._in_target = char == "[" and self._last_key == self.key
+                elif self._depth == 3 and self._in_target and char == "{":
+                    self._item_start = i
+            else:
+                if self._depth == 3 and self._item_start is not None:
+                    items.append(buffer[self._item_start : pos])
+                    self._item_start = None
+                elif self._depth == 2:
+                    self._in_target = False
+                self._depth -= 1
+        self._trim(len(buffer))
+        return items
+
+    def _trim(self, end: int):
+        """Drop buffered text that no pending item or key can refer back to."""
+        keep = end
+        if self._item_start is not None:
+            keep = self._item_start
+        elif self._in_string:
+            keep = self._string_start
+        self._buffer = self._buffer[keep:]
+        self._pos = end - keep
+        if self._item_start is not None:
+            self._item_start -= keep
+        if self._in_string:
+            self._string_start -= keep
@@ -1,28 +1,58 @@
 """LLM client — Cloudflare Workers AI (primary) + OpenAI-compatible (fallback).
 
 Uses official Cloudflare SDK for primary, httpx for OpenAI-compatible fallback.
+Both go through the shared connection pool in app.http_client.
 """
 
+import asyncio
 import json
+import random
+import time
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass, field
+from typing import TypeVar
 
 import httpx
 from cloudflare import AsyncCloudflare
+from pydantic import BaseModel, ValidationError
 
+from app import http_client, llm_cache, metrics, ratelimit, tracing
+from app.breaker import CircuitBreaker
 from app.config import settings
+from app.json_extract import parse_model
 from app.logger import logger
 
+M = TypeVar("M", bound=BaseModel)
+
+REPAIR_PROMPT = """The JSON below does not match the required schema.
+
+Errors:
+{errors}
+
+Schema:
+{schema}
+
+JSON:
+{content}
+
+Return ONLY the corrected JSON object, keeping every value that is already valid."""
+
 
 class LLMError(Exception):
     pass
 
 
 _cf_client: AsyncCloudflare | None = None
+_cf_http: httpx.AsyncClient | None = None
 
 
 def _get_cf_client() -> AsyncCloudflare:
-    global _cf_client
-    if _cf_client is None:
-        _cf_client = AsyncCloudflare(api_token=settings.llm_api_key)
+    """Cloudflare SDK client on the shared pool, rebuilt if the pool was replaced."""
+    global _cf_client, _cf_http
+    pool = http_client.get_client()
+    if _cf_client is None or _cf_http is not pool:
+        _cf_client = AsyncCloudflare(api_token=settings.llm_api_key, http_client=pool)
+        _cf_http = pool
     return _cf_client
 
 
@@ -30,13 +60,22 @@ async def _call_cloudflare(
     messages: list[dict],
     model: str,
     account_id: str,
+    schema: type[BaseModel] | None = None,
     **_kwargs,
 ) -> str:
     client = _get_cf_client()
+    extra = {}
+    if schema is not None:
+        # Workers AI JSON mode
+        extra["response_format"] = {
+            "type": "json_schema",
+            "json_schema": schema.model_json_schema(),
+        }
     result = await client.ai.run(
         model_name=model,
         account_id=account_id,
         messages=messages,
+        **extra,
     )
     content = result.get("response", "") if isinstance(result, dict) else result
     if isinstance(content, dict):
@@ -44,93 +83,524 @@ async def _call_cloudflare(
     return content or ""
 
 
+async def _sse_data(response) -> AsyncIterator[str]:
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        if data:
+            yield data
+
+
+async def _stream_cloudflare(
+    messages: list[dict], model: str, account_id: str, api_key: str, timeout: int
+) -> AsyncIterator[str]:
+    # The SDK doesn't expose token streaming, so talk to the REST endpoint directly.
+    url = f"https://{http_client.CLOUDFLARE_API_HOST}/client/v4/accounts/{account_id}/ai/run/{model}"
+    async with http_client.get_client().stream(
+        "POST",
+        url,
+        headers={"Authorization": f"Bearer {api_key}"},
+        json={"messages": messages, "stream": True},
+        timeout=timeout,
+    ) as resp:
+        resp.raise_for_status()
+        async for data in _sse_data(resp):
+            delta = json.loads(data).get("response")
+            if delta:
+                yield delta
+
+
+async def _stream_openai(
+    messages: list[dict], model: str, api_base: str, api_key: str, timeout: int
+) -> AsyncIterator[str]:
+    async with http_client.get_client().stream(
+        "POST",
+        f"{api_base}/chat/completions",
+        headers={"Authorization": f"Bearer {api_key}"},
+        json={"model": model, "messages": messages, "stream": True},
+        timeout=timeout,
+    ) as resp:
+        resp.raise_for_status()
+        async for data in _sse_data(resp):
+            choices = json.loads(data).get("choices") or []
+            delta = choices[0].get("delta", {}).get("content") if choices else None
+            if delta:
+                yield delta
+
+
 async def _call_openai(
     messages: list[dict],
     model: str,
     api_base: str,
     api_key: str,
     timeout: int,
+    schema: type[BaseModel] | None = None,
 ) -> str:
     url = f"{api_base}/chat/completions"
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        resp = await client.post(
-            url,
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            json={"model": model, "messages": messages},
+    body = {"model": model, "messages": messages}
+    if schema is not None:
+        body["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema()},
+        }
+    resp = await http_client.get_client().post(
+        url,
+        headers={
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        },
+        json=body,
+        timeout=timeout,
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    content = data["choices"][0]["message"]["content"]
+    if isinstance(content, dict):
+        return json.dumps(content)
+    return content
+
+
+async def complete(
+    messages: list[dict],
+    cache_version: str | None = None,
+    validate: Callable[[str], object] | None = None,
+    schema: type[BaseModel] | None = None,
+) -> str:
+    """Call LLM with automatic fallback. Returns raw string content.
+
+    Pass the prompt template version as cache_version to serve repeats of the
+    same prompt from the response cache (when llm_cache_enabled); content that
+    fails validate is not cached, and a hedged race skips it for the other call.
+    With schema, providers that support it are asked for structured output.
+    """
+    with tracing.span("llm.complete", cache_version=cache_version):
+        if cache_version is None or not settings.llm_cache_enabled:
+            content, _ = await _complete(messages, validate, schema)
+            return content
+
+        from app.main import get_redis
+
+        key = llm_cache.cache_key(settings.llm_model, cache_version, messages)
+        return await llm_cache.cached(
+            key,
+            settings.llm_model,
+            lambda: _complete(messages, validate, schema),
+            await get_redis(),
+            validate,
         )
-        resp.raise_for_status()
-        data = resp.json()
-        content = data["choices"][0]["message"]["content"]
-        if isinstance(content, dict):
-            return json.dumps(content)
-        return content
 
 
-async def complete(messages: list[dict]) -> str:
-    """Call LLM with automatic fallback. Returns raw string content."""
-    last_error: Exception | None = None
+@dataclass
+class Provider:
+    name: str
+    model: str
+    account_id: str | None
+    api_base: str | None
+    api_key: str | None
+    structured_output: bool = False
+    breaker: CircuitBreaker = field(init=False)
+
+    def __post_init__(self):
+        self.breaker = CircuitBreaker(
+            self.name,
+            window=settings.llm_breaker_window,
+            min_requests=settings.llm_breaker_min_requests,
+            error_rate=settings.llm_breaker_error_rate,
+            cooldown=settings.llm_breaker_cooldown,
+        )
+
+    @property
+    def is_cloudflare(self) -> bool:
+        return self.model.startswith("cloudflare/")
+
+    @property
+    def ready(self) -> bool:
+        if self.is_cloudflare:
+            return bool(self.account_id and self.api_key)
+        return bool(self.api_base and self.api_key)
+
+    async def call(self, messages: list[dict], schema: type[BaseModel] | None = None) -> str:
+        if not self.structured_output:
+            schema = None
+        if self.is_cloudflare:
+            return await _call_cloudflare(
+                messages=messages,
+                model=self.model.removeprefix("cloudflare/"),
+                account_id=self.account_id,
+                schema=schema,
+            )
+        return await _call_openai(
+            messages=messages,
+            model=self.model.removeprefix("openai/"),
+            api_base=self.api_base,
+            api_key=self.api_key,
+            timeout=settings.llm_timeout,
+            schema=schema,
+        )
+
+    def stream(self, messages: list[dict]) -> AsyncIterator[str]:
+        if self.is_cloudflare:
+            return _stream_cloudflare(
+                messages=messages,
+                model=self.model.removeprefix("cloudflare/"),
+                account_id=self.account_id,
+                api_key=self.api_key,
+                timeout=settings.llm_timeout,
+            )
+        return _stream_openai(
+            messages=messages,
+            model=self.model.removeprefix("openai/"),
+            api_base=self.api_base,
+            api_key=self.api_key,
+            timeout=settings.llm_timeout,
+        )
+
+
+_providers: list[Provider] | None = None
+
+
+def get_providers() -> list[Provider]:
+    global _providers
+    if _providers is None:
+        _providers = [
+            Provider(
+                name="primary",
+                model=settings.llm_model,
+                account_id=settings.llm_account_id,
+                api_base=settings.llm_api_base,
+                api_key=settings.llm_api_key,
+                structured_output=settings.llm_structured_output,
+            )
+        ]
+        if settings.llm_fallback_model:
+            _providers.append(
+                Provider(
+                    name="fallback",
+                    model=settings.llm_fallback_model,
+                    account_id=settings.llm_fallback_account_id or settings.llm_account_id,
+                    api_base=settings.llm_fallback_api_base or settings.llm_api_base,
+                    api_key=settings.llm_fallback_api_key or settings.llm_api_key,
+                    structured_output=settings.llm_fallback_structured_output,
+                )
+            )
+    return _providers
+
+
+def breaker_states() -> dict:
+    return {p.name: {"model": p.model, **p.breaker.snapshot()} for p in get_providers()}
+
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (1-based)."""
+    ceiling = min(settings.llm_backoff_max, settings.llm_backoff_base * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+
+async def _attempt(
+    provider: Provider,
+    messages: list[dict],
+    schema: type[BaseModel] | None = None,
+    attempt: str = "1",
+) -> str:
+    """One call through the provider's breaker. The caller must have claimed allow()."""
+    start = None
+    try:
+        with tracing.span(
+            "llm.attempt", provider=provider.name, model=provider.model, attempt=attempt
+        ) as span:
+            async with ratelimit.limit(provider.name, provider.model, messages):
+                start = time.monotonic()
+                span.set(queued_ms=round((time.time_ns() - span.start_ns) / 1e6, 1))
+                content = await provider.call(messages, schema)
+    except asyncio.CancelledError:
+        provider.breaker.release()
+        raise
+    except Exception:
+        provider.breaker.record_failure()
+        if start is not None:
+            metrics.llm_latency(provider.name, provider.model, attempt, "error").observe(
+                time.monotonic() - start
+            )
+        raise
+    elapsed = time.monotonic() - start
+    provider.breaker.record_success(elapsed)
+    metrics.llm_latency(provider.name, provider.model, attempt, "ok").observe(elapsed)
+    metrics.llm_completions(provider.name).inc()
+    return content
+
+
+class _HedgeBudget:
+    """Caps hedged (duplicate) requests per rolling minute, per process."""
+
+    def __init__(self):
+        self.window_start = 0.0
+        self.used = 0
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        if now - self.window_start >= 60:
+            self.window_start = now
+            self.used = 0
+        if self.used >= settings.llm_hedge_budget_per_minute:
+            return False
+        self.used += 1
+        return True
+
+
+_hedge_budget = _HedgeBudget()
+hedge_stats = {"fired": 0, "won": 0, "over_budget": 0}
+
+
+async def _hedged(
+    messages: list[dict],
+    validate: Callable[[str], object] | None,
+    schema: type[BaseModel] | None,
+    tried: dict[str, int],
+) -> tuple[str, str] | None:
+    """Race the primary against the fallback once the primary is slower than usual.
 
-    # Primary
-    model = settings.llm_model
-    primary_ready = (
-        model.startswith("cloudflare/") and settings.llm_account_id and settings.llm_api_key
-    ) or (
-        not model.startswith("cloudflare/") and settings.llm_api_base and settings.llm_api_key
+    The fallback is only started if the primary hasn't answered within the
+    configured percentile of its recent latency and the hedge budget allows.
+    The first valid response wins and the other call is cancelled. Returns
+    (content, model that answered), or None when hedging doesn't apply (no
+    ready pair, too few samples, circuit open). Every call made is counted in
+    tried by provider name, so the retry loop can take them into account.
+    """
+    providers = [p for p in get_providers() if p.ready]
+    if len(providers) < 2:
+        return None
+    primary, backup = providers[0], providers[1]
+    delay = primary.breaker.latency_percentile(
+        settings.llm_hedge_percentile, min_samples=settings.llm_hedge_min_samples
     )
-    if primary_ready:
-        for attempt in range(1, settings.llm_retries + 1):
+    if delay is None or not primary.breaker.allow():
+        return None
+
+    started = time.monotonic()
+    first = asyncio.create_task(_attempt(primary, messages, schema, "hedge"))
+    tried[primary.name] = 1
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done or not backup.breaker.available():
+            return await first, primary.model
+        if not _hedge_budget.take():
+            hedge_stats["over_budget"] += 1
+            metrics.HEDGE_OVER_BUDGET.inc()
+            return await first, primary.model
+        if not backup.breaker.allow():
+            return await first, primary.model
+
+        hedge_stats["fired"] += 1
+        metrics.HEDGE_FIRED.inc()
+        second = asyncio.create_task(_attempt(backup, messages, schema, "hedge"))
+        tried[backup.name] = 1
+        tasks.append(second)
+        pending = set(tasks)
+        invalid: tuple[str, str] | None = None
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                content = task.result()
+                model = backup.model if task is second else primary.model
+                if llm_cache.usable(content, validate):
+                    if task is second:
+                        hedge_stats["won"] += 1
+                        metrics.HEDGE_WON.inc()
+                        if not first.done():
+                            # The primary's latency is at least this long; without
+                            # the sample its slowest calls vanish from the p95.
+                            primary.breaker.record_latency(time.monotonic() - started)
+                    return content, model
+                invalid = content, model
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    if invalid is not None:
+        return invalid
+    raise error
+
+
+async def _complete(
+    messages: list[dict],
+    validate: Callable[[str], object] | None = None,
+    schema: type[BaseModel] | None = None,
+) -> tuple[str, str]:
+    """Try providers in priority order, skipping any whose circuit is open.
+
+    A failed hedged race counts as each raced provider's first attempt, so
+    no provider is called more than llm_retries times. Returns (content,
+    model that answered).
+    """
+    last_error: Exception | None = None
+    tried: dict[str, int] = {}
+
+    if settings.llm_hedge_enabled:
+        try:
+            answer = await _hedged(messages, validate, schema, tried)
+            if answer is not None:
+                return answer
+        except Exception as e:
+            last_error = e
+            logger.warning("LLM hedged call failed", error=str(e), sampled=True)
+
+    for provider in get_providers():
+        if not provider.ready:
+            continue
+        used = tried.get(provider.name, 0)
+        if 0 < used < settings.llm_retries:
+            await asyncio.sleep(_backoff(used))
+        for attempt in range(used + 1, settings.llm_retries + 1):
+            if not provider.breaker.allow():
+                logger.info(
+                    "LLM circuit open, skipping",
+                    provider=provider.name,
+                    model=provider.model,
+                    sampled=True,
+                )
+                break
             try:
-                if model.startswith("cloudflare/"):
-                    return await _call_cloudflare(
-                        messages=messages,
-                        model=model.removeprefix("cloudflare/"),
-                        account_id=settings.llm_account_id,
-                    )
-                else:
-                    return await _call_openai(
-                        messages=messages,
-                        model=model.removeprefix("openai/"),
-                        api_base=settings.llm_api_base,
-                        api_key=settings.llm_api_key,
-                        timeout=settings.llm_timeout,
-                    )
+                return await _attempt(provider, messages, schema, str(attempt)), provider.model
             except Exception as e:
                 last_error = e
-                logger.warning("LLM primary failed", model=model, attempt=attempt, error=str(e))
-
-    # Fallback
-    fb = settings.llm_fallback_model
-    if fb:
-        fb_account = settings.llm_fallback_account_id or settings.llm_account_id
-        fb_key = settings.llm_fallback_api_key or settings.llm_api_key
-        fb_base = settings.llm_fallback_api_base or settings.llm_api_base
-        fallback_ready = (
-            fb.startswith("cloudflare/") and fb_account and fb_key
-        ) or (
-            not fb.startswith("cloudflare/") and fb_base and fb_key
-        )
-        if fallback_ready:
-            for attempt in range(1, settings.llm_retries + 1):
-                try:
-                    if fb.startswith("cloudflare/"):
-                        return await _call_cloudflare(
-                            messages=messages,
-                            model=fb.removeprefix("cloudflare/"),
-                            account_id=fb_account,
-                        )
-                    else:
-                        return await _call_openai(
-                            messages=messages,
-                            model=fb.removeprefix("openai/"),
-                            api_base=fb_base,
-                            api_key=fb_key,
-                            timeout=settings.llm_timeout,
-                        )
-                except Exception as e:
-                    last_error = e
-                    logger.warning("LLM fallback failed", model=fb, attempt=attempt, error=str(e))
+                logger.warning(
+                    "LLM provider failed",
+                    provider=provider.name,
+                    model=provider.model,
+                    attempt=attempt,
+                    error=str(e),
+                    sampled=True,
+                )
+            if attempt < settings.llm_retries:
+                await asyncio.sleep(_backoff(attempt))
 
     raise LLMError(f"All LLM providers failed: {last_error}")
+
+
+async def complete_stream(messages: list[dict]) -> AsyncIterator[str]:
+    """Yield completion text deltas as the provider produces them.
+
+    Falls over to the next provider only if nothing has been yielded yet;
+    a failure mid-stream raises LLMError.
+    """
+    # Not tracing.span(): its context variable would be set across the yields.
+    span = tracing.start_span("llm.stream")
+    deltas = _stream(messages, span)
+    try:
+        async for delta in deltas:
+            yield delta
+    except BaseException as e:
+        tracing.end_span(span, e)
+        raise
+    finally:
+        await deltas.aclose()
+    tracing.end_span(span)
+
+
+async def _stream(messages: list[dict], span: tracing.Span) -> AsyncIterator[str]:
+    last_error: Exception | None = None
+
+    for provider in get_providers():
+        if not provider.ready or not provider.breaker.allow():
+            continue
+        deltas = 0
+        try:
+            async with ratelimit.limit(provider.name, provider.model, messages):
+                start = time.monotonic()
+                async for delta in provider.stream(messages):
+                    deltas += 1
+                    yield delta
+        except (asyncio.CancelledError, GeneratorExit):
+            provider.breaker.release()
+            raise
+        except Exception as e:
+            provider.breaker.record_failure()
+            last_error = e
+            logger.warning(
+                "LLM provider stream failed",
+                provider=provider.name,
+                model=provider.model,
+                error=str(e),
+                sampled=True,
+            )
+            if deltas:
+                raise LLMError(f"LLM stream interrupted: {e}") from e
+            continue
+        elapsed = time.monotonic() - start
+        provider.breaker.record_success(elapsed)
+        metrics.llm_latency(provider.name, provider.model, "stream", "ok").observe(elapsed)
+        metrics.llm_completions(provider.name).inc()
+        span.set(provider=provider.name, model=provider.model, deltas=deltas)
+        return
+
+    raise LLMError(f"All LLM providers failed: {last_error}")
+
+
+parse_stats = {"parsed": 0, "parse_failures": 0, "repaired": 0, "repair_failures": 0}
+
+
+def _describe(error: ValidationError) -> str:
+    return "\n".join(
+        f"- {'.'.join(map(str, e['loc'])) or '(root)'}: {e['msg']}"
+        for e in error.errors(include_url=False)
+    )
+
+
+async def complete_model(
+    messages: list[dict], model: type[M], cache_version: str | None = None
+) -> M:
+    """complete() validated into model.
+
+    Asks for structured output and, if the result still doesn't validate,
+    makes one repair call that sends only the bad JSON, the errors and the
+    schema (not the original prompt) before giving up with the ValidationError.
+    """
+    # The cache and the hedged race validate the completion already; keep
+    # what they parsed so the winning content is not parsed a second time.
+    parsed: dict[str, M] = {}
+
+    def validate(text: str) -> M:
+        parsed[text] = parse_model(text, model)
+        return parsed[text]
+
+    content = await complete(messages, cache_version=cache_version, validate=validate, schema=model)
+    try:
+        result = parsed[content] if content in parsed else parse_model(content, model)
+        parse_stats["parsed"] += 1
+        metrics.llm_parse(model.__name__, "ok").inc()
+        return result
+    except ValidationError as e:
+        parse_stats["parse_failures"] += 1
+        metrics.llm_parse(model.__name__, "failed").inc()
+        error = e
+        logger.warning(
+            "LLM output invalid, repairing",
+            schema=model.__name__,
+            errors=error.error_count(),
+            sampled=True,
+        )
+
+    prompt = REPAIR_PROMPT.format(
+        errors=_describe(error),
+        schema=json.dumps(model.model_json_schema()),
+        content=content,
+    )
+    repaired = await complete([{"role": "user", "content": prompt}], schema=model)
+    try:
+        result = parse_model(repaired, model)
+    except ValidationError:
+        parse_stats["repair_failures"] += 1
+        metrics.llm_parse(model.__name__, "repair_failed").inc()
+        raise
+    parse_stats["repaired"] += 1
+    metrics.llm_parse(model.__name__, "repaired").inc()
+    return result
@@ -0,0 +1,126 @@
+"""Content-addressed cache for LLM completions.
+
+Keys hash the model, the prompt template version and the message content, so a
+changed rubric or model never serves stale output. Entries live in Redis with a
+TTL; an index sorted set caps the entry count and evicts the oldest first.
+Identical requests running concurrently in this process share one upstream call.
+Only the keyed model's own completions are stored: when a fallback provider or
+a hedged call answers, the content is returned but not cached under the
+primary model's key.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections.abc import Awaitable, Callable
+
+from redis.asyncio import Redis
+
+from app import metrics, tracing
+from app.config import settings
+from app.logger import logger
+
+KEY_PREFIX = "llm:cache:"
+INDEX_KEY = "llm:cache:index"
+
+stats = {"hits": 0, "misses": 0, "shared": 0, "takeovers": 0}
+
+_inflight: dict[str, asyncio.Future] = {}
+
+
+def cache_key(model: str, version: str, messages: list[dict]) -> str:
+    body = json.dumps(messages, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    digest = hashlib.sha256(f"{model}\n{version}\n{body}".encode()).hexdigest()
+    return KEY_PREFIX + digest
+
+
+async def cached(
+    key: str,
+    model: str,
+    fetch: Callable[[], Awaitable[tuple[str, str]]],
+    redis: Redis,
+    validate: Callable[[str], object] | None = None,
+) -> str:
+    """Return the cached completion for key, or run fetch once and store it.
+
+    key must have been built for model; fetch returns (content, model that
+    answered). Content from another model (a fallback or a hedge that won) is
+    returned but not stored, so an entry always holds the keyed model's answer.
+    If validate raises on the fetched content it is also not stored, so a
+    malformed completion is not replayed to every retry. If the caller running
+    fetch is cancelled, the callers sharing it start over and one takes over.
+    """
+    while (pending := _inflight.get(key)) is not None:
+        stats["shared"] += 1
+        metrics.cache_lookup("llm", "shared").inc()
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise
+            stats["takeovers"] += 1
+
+    future = asyncio.get_running_loop().create_future()
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _inflight[key] = future
+    try:
+        with tracing.span("llm_cache.get") as span:
+            content = await _get(redis, key)
+            span.set(hit=content is not None)
+        if content is not None:
+            stats["hits"] += 1
+            metrics.cache_lookup("llm", "hit").inc()
+        else:
+            stats["misses"] += 1
+            metrics.cache_lookup("llm", "miss").inc()
+            content, answered = await fetch()
+            if answered == model and usable(content, validate):
+                await _put(redis, key, content)
+        future.set_result(content)
+        return content
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+
+def usable(content: str, validate: Callable[[str], object] | None) -> bool:
+    if validate is None:
+        return True
+    try:
+        validate(content)
+    except Exception:
+        return False
+    return True
+
+
+async def _get(redis: Redis, key: str) -> str | None:
+    try:
+        return await redis.get(key)
+    except Exception as e:
+        logger.warning("LLM cache read failed", error=str(e), sampled=True)
+        return None
+
+
+async def _put(redis: Redis, key: str, content: str):
+    now = time.time()
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.set(key, content, ex=settings.llm_cache_ttl)
+            pipe.zadd(INDEX_KEY, {key: now})
+            pipe.zremrangebyscore(INDEX_KEY, 0, now - settings.llm_cache_ttl)
+            pipe.zcard(INDEX_KEY)
+            *_, size = await pipe.execute()
+
+        overflow = size - settings.llm_cache_max_entries
+        if overflow > 0:
+            evicted = await redis.zpopmin(INDEX_KEY, overflow)
+            if evicted:
+                await redis.delete(*(k for k, _ in evicted))
+    except Exception as e:
+        logger.warning("LLM cache write failed", error=str(e), sampled=True)
@@ -1,21 +1,134 @@
+"""structlog setup: JSON lines on stdout, written off the event loop.
+
+Rendered lines go onto a bounded queue that a daemon thread drains to stdout
+in batches, so a slow or blocked stdout never stalls the loop; if the queue is
+full the line is dropped and counted instead.
+
+Noisy warnings (one per failed LLM attempt during an outage, and the like) opt
+in to rate limiting at the call site with sampled=True: at most log_event_limit
+lines per event name per log_event_window seconds, with the number suppressed
+reported on the next line that gets through. Everything else, and any error,
+always passes. Per-item lines such as a submission's failure must not be
+sampled, and sampled event names must be static so the limiter's state stays
+bounded.
+"""
+
+import atexit
+import queue
+import sys
+import threading
+import time
+
+import orjson
 import structlog
 from structlog._log_levels import NAME_TO_LEVEL
+from app import tracing
 from app.config import settings
 
+QUEUE_SIZE = 10_000
+BATCH_SIZE = 256
+
+stats = {"dropped": 0, "suppressed": 0}
+
+def add_trace_context(_logger, _method, event_dict):
+    span = tracing.current()
+    if span is not None:
+        event_dict.setdefault("trace_id", span.trace_id)
+        event_dict.setdefault("span_id", span.span_id)
+    return event_dict
+
+
+class EventRateLimiter:
+    """Processor letting through at most `limit` lines per sampled event per `window` seconds."""
+
+    def __init__(self, limit: int, window: float, clock=time.monotonic):
+        self.limit = limit
+        self.window = window
+        self.clock = clock
+        # event -> [window start, lines passed, lines suppressed]
+        self._events: dict[str, list] = {}
+
+    def __call__(self, _logger, method, event_dict):
+        sampled = event_dict.pop("sampled", False)
+        if not sampled or self.limit <= 0 or NAME_TO_LEVEL.get(method, 0) >= NAME_TO_LEVEL["error"]:
+            return event_dict
+        event = event_dict.get("event")
+        now = self.clock()
+        state = self._events.get(event)
+        if state is None or now - state[0] >= self.window:
+            if state and state[2]:
+                event_dict["suppressed"] = state[2]
+            self._events[event] = [now, 1, 0]
+            return event_dict
+        if state[1] < self.limit:
+            state[1] += 1
+            return event_dict
+        state[2] += 1
+        stats["suppressed"] += 1
+        raise structlog.DropEvent
+
+
+class QueueWriter:
+    """structlog logger that hands rendered lines to a background writer thread."""
+
+    def __init__(self, stream=None):
+        self._stream = stream or sys.stdout.buffer
+        self._queue: queue.Queue[bytes | None] = queue.Queue(QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._drain, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def msg(self, line: bytes):
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            stats["dropped"] += 1
+
+    log = debug = info = warn = warning = error = critical = exception = fatal = msg
+
+    def _drain(self):
+        while True:
+            line = self._queue.get()
+            batch = []
+            while line is not None:
+                batch.append(line)
+                if len(batch) >= BATCH_SIZE:
+                    break
+                try:
+                    line = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._stream.write(b"\n".join(batch) + b"\n")
+                self._stream.flush()
+            if line is None:
+                return
+
+    def close(self):
+        """Flush what's queued and stop the thread (registered at exit)."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=2)
+
+
+_writer = QueueWriter()
+
 structlog.configure(
     processors=[
         structlog.contextvars.merge_contextvars,
+        add_trace_context,
         structlog.processors.add_log_level,
+        EventRateLimiter(settings.log_event_limit, settings.log_event_window),
         structlog.processors.TimeStamper(fmt="iso"),
         structlog.processors.StackInfoRenderer(),
         structlog.processors.format_exc_info,
-        structlog.processors.JSONRenderer(),
+        structlog.processors.JSONRenderer(serializer=orjson.dumps),
     ],
     wrapper_class=structlog.make_filtering_bound_logger(
         NAME_TO_LEVEL[settings.log_level.lower()]
     ),
     context_class=dict,
-    logger_factory=structlog.PrintLoggerFactory(),
+    logger_factory=lambda *_args: _writer,
     cache_logger_on_first_use=True,
 )
 
@@ -1,13 +1,17 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from redis.asyncio import Redis
 
+from app import http_client
 from app.ai_routes import ai_router
 from app.config import settings
 from app.grading import grade_router
 from app.health import health_router
 from app.logger import logger
+from app.metrics import MetricsMiddleware
+from app.worker import Worker
 
 _redis: Redis | None = None
 
@@ -23,13 +27,27 @@ async def get_redis() -> Redis:
 async def lifespan(app: FastAPI):
     global _redis
     _redis = Redis.from_url(settings.redis_url, decode_responses=True)
+    http_client.get_client()
+    worker, worker_task = None, None
+    if settings.worker_enabled:
+        worker = Worker(_redis)
+        worker_task = asyncio.create_task(worker.run())
     logger.info("started")
     yield
+    if worker:
+        worker_task.cancel()
+        try:
+            await worker_task
+        except asyncio.CancelledError:
+            pass
+        await worker.stop()
+    await http_client.aclose()
     if _redis:
         await _redis.aclose()
 
 
 app = FastAPI(title="VSTEP Grading Service", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 app.include_router(health_router)
 app.include_router(ai_router)
 app.include_router(grade_router)
@@ -0,0 +1,122 @@
+"""Prometheus metrics, served at /metrics.
+
+Label children are bound once and reused (module-level for fixed label sets,
+lru_cache for ones discovered at runtime), so recording on the hot path is a
+dict lookup plus an observe(). Nothing here awaits, so no lock is ever held
+across an await.
+"""
+
+from functools import lru_cache
+from time import perf_counter
+
+from prometheus_client import Counter, Histogram
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+BYTES_BUCKETS = (16e3, 64e3, 256e3, 1e6, 4e6, 16e6, 64e6)
+
+HTTP_LATENCY = Histogram(
+    "grading_http_request_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_LATENCY = Histogram(
+    "grading_llm_request_seconds",
+    "LLM provider call latency, per attempt",
+    ["provider", "model", "attempt", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_COMPLETIONS = Counter(
+    "grading_llm_completions_total",
+    "Completions served, by provider (fallback usage)",
+    ["provider"],
+)
+LLM_HEDGES = Counter("grading_llm_hedges_total", "Hedged LLM requests", ["outcome"])
+LLM_PARSE = Counter(
+    "grading_llm_parse_total",
+    "Validation of LLM output into a schema",
+    ["schema", "outcome"],
+)
+STT_LATENCY = Histogram(
+    "grading_stt_seconds",
+    "Transcription latency including download",
+    ["source"],
+    buckets=LATENCY_BUCKETS,
+)
+AUDIO_DOWNLOAD_SECONDS = Histogram(
+    "grading_audio_download_seconds",
+    "Time to stream a speaking recording",
+    buckets=LATENCY_BUCKETS,
+)
+AUDIO_DOWNLOAD_BYTES = Histogram(
+    "grading_audio_download_bytes",
+    "Size of downloaded speaking recordings",
+    buckets=BYTES_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "grading_cache_lookups_total",
+    "Cache lookups by cache and result; hit ratio = hit / (hit + miss)",
+    ["cache", "result"],
+)
+
+HEDGE_FIRED = LLM_HEDGES.labels("fired")
+HEDGE_WON = LLM_HEDGES.labels("won")
+HEDGE_OVER_BUDGET = LLM_HEDGES.labels("over_budget")
+
+
+@lru_cache(maxsize=None)
+def http_latency(method: str, route: str, status: int):
+    return HTTP_LATENCY.labels(method, route, str(status))
+
+
+@lru_cache(maxsize=None)
+def llm_latency(provider: str, model: str, attempt: str, outcome: str):
+    return LLM_LATENCY.labels(provider, model, attempt, outcome)
+
+
+@lru_cache(maxsize=None)
+def llm_completions(provider: str):
+    return LLM_COMPLETIONS.labels(provider)
+
+
+@lru_cache(maxsize=None)
+def llm_parse(schema: str, outcome: str):
+    return LLM_PARSE.labels(schema, outcome)
+
+
+@lru_cache(maxsize=None)
+def stt_latency(source: str):
+    return STT_LATENCY.labels(source)
+
+
+@lru_cache(maxsize=None)
+def cache_lookup(cache: str, result: str):
+    return CACHE_LOOKUPS.labels(cache, result)
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware timing every HTTP request by its route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            http_latency(scope["method"], path, status).observe(perf_counter() - start)
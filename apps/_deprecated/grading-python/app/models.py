@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from typing import Literal
 
 
@@ -14,16 +14,55 @@ class WritingAnswer(BaseModel):
     task_type: str = Field("essay", alias="taskType")
 
 
+class SpeakingPart(BaseModel):
+    """One recorded part: a ready transcript or an audio URL to transcribe"""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    transcript: str | None = None
+    audio_url: str | None = Field(None, alias="audioUrl")
+    duration_seconds: float = Field(0, alias="durationSeconds")
+    part_number: int = Field(1, alias="partNumber")
+
+    @model_validator(mode="after")
+    def _has_source(self):
+        if self.transcript is None and not self.audio_url:
+            raise ValueError("transcript or audioUrl is required")
+        return self
+
+
 class SpeakingAnswer(BaseModel):
+    """Single part (transcript/audioUrl at top level) or multi-part (parts)"""
+
     model_config = ConfigDict(populate_by_name=True)
 
-    transcript: str
+    transcript: str | None = None
+    audio_url: str | None = Field(None, alias="audioUrl")
     duration_seconds: float = Field(0, alias="durationSeconds")
     part_number: int = Field(1, alias="partNumber")
+    parts: list[SpeakingPart] | None = None
+
+    @model_validator(mode="after")
+    def _has_source(self):
+        if not self.parts and self.transcript is None and not self.audio_url:
+            raise ValueError("transcript, audioUrl or parts is required")
+        return self
+
+    def segments(self) -> list[SpeakingPart]:
+        if self.parts:
+            return self.parts
+        return [
+            SpeakingPart(
+                transcript=self.transcript,
+                audio_url=self.audio_url,
+                duration_seconds=self.duration_seconds,
+                part_number=self.part_number,
+            )
+        ]
 
 
 class Task(BaseModel):
-    """Matches backend LPUSH payload to grading:tasks"""
+    """Matches backend payload on the grading:tasks stream (see app.worker)"""
 
     model_config = ConfigDict(populate_by_name=True)
 
@@ -49,7 +88,8 @@ class GrammarError(BaseModel):
 
 class Result(BaseModel):
     """Matches backend src/db/types/grading.ts AIResult exactly.
-    Serialized as camelCase JSONB in submission_details.result"""
+    Serialized as camelCase JSONB in submission_details.result.
+    timings (per-stage ms) and promptVersion are extra diagnostics the backend ignores"""
 
     model_config = ConfigDict(populate_by_name=True)
 
@@ -62,6 +102,8 @@ class Result(BaseModel):
     )
     confidence: Literal["high", "medium", "low"]
     graded_at: str | None = Field(default=None, alias="gradedAt")
+    timings: dict[str, float] | None = None
+    prompt_version: str | None = Field(default=None, alias="promptVersion")
 
 
 class WritingScore(BaseModel):
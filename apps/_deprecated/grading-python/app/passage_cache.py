@@ -0,0 +1,78 @@
+"""Two-tier cache for tutor responses (/ai/paraphrase, /ai/explain).
+
+Every learner opening the same exam asks about the same passages, so validated
+responses are kept in an in-process LRU in front of Redis. Keys hash a
+normalized form of the request: whitespace-collapsed NFC text, sorted question
+numbers and sorted answer maps, so cosmetic differences still hit.
+"""
+
+import hashlib
+import json
+import unicodedata
+from collections import OrderedDict
+
+from pydantic import BaseModel
+from redis.asyncio import Redis
+
+from app import metrics
+from app.config import settings
+from app.logger import logger
+
+KEY_PREFIX = "ai:passage:"
+
+stats = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+_local: OrderedDict[str, str] = OrderedDict()
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize("NFC", value).split())
+    if isinstance(value, dict):
+        return {_normalize(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return sorted(_normalize(v) for v in value)
+    return value
+
+
+def cache_key(kind: str, version: str, req: BaseModel) -> str:
+    body = json.dumps(_normalize(req.model_dump()), sort_keys=True, ensure_ascii=False)
+    return f"{KEY_PREFIX}{kind}:{version}:{hashlib.sha256(body.encode()).hexdigest()}"
+
+
+def _remember(key: str, value: str):
+    _local[key] = value
+    _local.move_to_end(key)
+    while len(_local) > settings.passage_cache_local_size:
+        _local.popitem(last=False)
+
+
+async def get(redis: Redis, key: str) -> str | None:
+    """Cached response JSON for key, or None."""
+    if key in _local:
+        _local.move_to_end(key)
+        stats["local_hits"] += 1
+        metrics.cache_lookup("passage_local", "hit").inc()
+        return _local[key]
+    metrics.cache_lookup("passage_local", "miss").inc()
+    try:
+        value = await redis.get(key)
+    except Exception as e:
+        logger.warning("passage cache read failed", error=str(e), sampled=True)
+        value = None
+    if value is None:
+        stats["misses"] += 1
+        metrics.cache_lookup("passage_redis", "miss").inc()
+        return None
+    stats["redis_hits"] += 1
+    metrics.cache_lookup("passage_redis", "hit").inc()
+    _remember(key, value)
+    return value
+
+
+async def put(redis: Redis, key: str, value: str):
+    _remember(key, value)
+    try:
+        await redis.set(key, value, ex=settings.passage_cache_ttl)
+    except Exception as e:
+        logger.warning("passage cache write failed", error=str(e), sampled=True)
@@ -1,5 +1,19 @@
-def writing(text: str, task_type: str) -> str:
-    return f"""You are a VSTEP writing examiner. Grade the following {task_type} using the VSTEP writing rubric.
+"""Grading prompts as system + user message pairs.
+
+Everything that is the same for every submission (role, rubric, instructions,
+output schema) lives in a system message compiled once at import, and the
+per-submission content comes last in the user message. Requests then share a
+long identical prefix, which providers can serve from their prompt/KV cache
+instead of re-processing the rubric each time (see benchmarks/prompt_prefix.py).
+
+Bump the version whenever a template changes: it is part of the LLM cache key
+and is recorded on every Result as promptVersion.
+"""
+
+WRITING_VERSION = "writing-v2"
+SPEAKING_VERSION = "speaking-v2"
+
+WRITING_SYSTEM = """You are a VSTEP writing examiner. Grade the student's response using the VSTEP writing rubric.
 
 ## Rubric (each criterion 0-10, use 0.5 increments)
 
@@ -8,38 +22,21 @@ def writing(text: str, task_type: str) -> str:
 - **Vocabulary**: Range and accuracy of vocabulary. Appropriateness of word choice and collocations.
 - **Grammar**: Variety and correctness of grammatical structures. Control of complex sentences.
 
-## Student Response
-
-{text}
-
 ## Instructions
 
-Evaluate the response against each criterion. Provide constructive feedback highlighting strengths and areas for improvement. Assess your own confidence in the grading accuracy.
+The user message gives the task type and the student response. Evaluate the response against each criterion. Provide constructive feedback highlighting strengths and areas for improvement. Assess your own confidence in the grading accuracy.
 
 Respond with ONLY valid JSON matching this schema:
-{{
+{
   "task_fulfillment": <float 0-10>,
   "organization": <float 0-10>,
   "vocabulary": <float 0-10>,
   "grammar": <float 0-10>,
   "feedback": "<constructive feedback as a single string>",
   "confidence": "<high|medium|low>"
-}}"""
-
-
-SPEAKING_PART_CONTEXT = {
-    1: "This is Part 1 (Social Interaction): The candidate answers questions about familiar topics and personal experiences.",
-    2: "This is Part 2 (Solution Discussion): The candidate discusses a problem or situation and proposes solutions.",
-    3: "This is Part 3 (Topic Development): The candidate develops and supports opinions on an abstract or complex topic.",
-}
-
-
-def speaking(transcript: str, part_number: int) -> str:
-    context = SPEAKING_PART_CONTEXT.get(part_number, SPEAKING_PART_CONTEXT[1])
-
-    return f"""You are a VSTEP speaking examiner. Grade the following spoken response transcript using the VSTEP speaking rubric.
+}"""
 
-{context}
+SPEAKING_SYSTEM = """You are a VSTEP speaking examiner. Grade the candidate's spoken response transcript using the VSTEP speaking rubric.
 
 ## Rubric (each criterion 0-10, use 0.5 increments)
 
@@ -48,20 +45,37 @@ def speaking(transcript: str, part_number: int) -> str:
 - **Grammar**: Variety and correctness of grammatical structures in spoken language.
 - **Vocabulary**: Range and precision of vocabulary. Use of topic-specific and academic language.
 
-## Transcript
-
-{transcript}
-
 ## Instructions
 
-Evaluate the transcript against each criterion. Account for the fact this is spoken language transcribed to text. Provide constructive feedback. Assess your own confidence in the grading accuracy.
+The user message says which part of the test this is and gives the transcript. Evaluate the transcript against each criterion. Account for the fact this is spoken language transcribed to text. Provide constructive feedback. Assess your own confidence in the grading accuracy.
 
 Respond with ONLY valid JSON matching this schema:
-{{
+{
   "fluency_organization": <float 0-10>,
   "pronunciation": <float 0-10>,
   "grammar": <float 0-10>,
   "vocabulary": <float 0-10>,
   "feedback": "<constructive feedback as a single string>",
   "confidence": "<high|medium|low>"
-}}"""
+}"""
+
+SPEAKING_PART_CONTEXT = {
+    1: "This is Part 1 (Social Interaction): The candidate answers questions about familiar topics and personal experiences.",
+    2: "This is Part 2 (Solution Discussion): The candidate discusses a problem or situation and proposes solutions.",
+    3: "This is Part 3 (Topic Development): The candidate develops and supports opinions on an abstract or complex topic.",
+}
+
+
+def writing(text: str, task_type: str) -> list[dict]:
+    return [
+        {"role": "system", "content": WRITING_SYSTEM},
+        {"role": "user", "content": f"## Task Type\n\n{task_type}\n\n## Student Response\n\n{text}"},
+    ]
+
+
+def speaking(transcript: str, part_number: int) -> list[dict]:
+    context = SPEAKING_PART_CONTEXT.get(part_number, SPEAKING_PART_CONTEXT[1])
+    return [
+        {"role": "system", "content": SPEAKING_SYSTEM},
+        {"role": "user", "content": f"{context}\n\n## Transcript\n\n{transcript}"},
+    ]
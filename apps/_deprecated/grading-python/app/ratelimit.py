@@ -0,0 +1,162 @@
+"""Redis-backed LLM rate limiting shared by every grading replica.
+
+Per upstream model there are two token buckets (requests per second and
+estimated tokens per minute) and a concurrency cap held as expiring leases in
+a sorted set. All three live in Redis and use Redis server time, so the
+limits are global rather than per process.
+
+Callers wait instead of failing. Within a process waiters are served in
+arrival order (asyncio.Lock is FIFO), so the head of the queue is the only one
+polling Redis. If Redis is unreachable the limiter fails open.
+"""
+
+import asyncio
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from redis.asyncio import Redis
+
+from app.config import settings
+from app.logger import logger
+
+# KEYS: request bucket, token bucket. ARGV per bucket: rate per ms, burst, cost.
+# Returns 0 when both costs were taken, else ms until they could be.
+_BUCKETS_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local wait = 0
+local levels = {}
+for i = 1, 2 do
+  local rate = tonumber(ARGV[i * 3 - 2])
+  local burst = tonumber(ARGV[i * 3 - 1])
+  local cost = tonumber(ARGV[i * 3])
+  local b = redis.call('HMGET', KEYS[i], 'level', 'ts')
+  local level = tonumber(b[1]) or burst
+  local ts = tonumber(b[2]) or now
+  level = math.min(burst, level + math.max(0, now - ts) * rate)
+  if level < cost then
+    wait = math.max(wait, math.ceil((cost - level) / rate))
+  end
+  levels[i] = level
+end
+for i = 1, 2 do
+  local level = levels[i]
+  if wait == 0 then
+    level = level - tonumber(ARGV[i * 3])
+  end
+  redis.call('HSET', KEYS[i], 'level', tostring(level), 'ts', now)
+  redis.call('PEXPIRE', KEYS[i], 120000)
+end
+return wait
+"""
+
+# KEYS: lease set. ARGV: limit, lease ms, lease id. Returns 1 if a slot was taken.
+_SLOT_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[1]) then
+  redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[3])
+  redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[2]))
+  return 1
+end
+return 0
+"""
+
+SLOT_POLL_MIN = 0.05
+SLOT_POLL_MAX = 0.5
+
+_queues: dict[str, asyncio.Lock] = {}
+_scripts: dict[tuple[int, str], object] = {}
+
+
+def _limits(provider: str) -> tuple[float, int, int]:
+    if provider == "fallback":
+        return (
+            settings.llm_fallback_rps,
+            settings.llm_fallback_tpm,
+            settings.llm_fallback_max_concurrency,
+        )
+    return settings.llm_rps, settings.llm_tpm, settings.llm_max_concurrency
+
+
+def estimate_tokens(messages: list[dict]) -> int:
+    """Rough prompt size (~4 chars per token) plus the expected completion."""
+    chars = sum(len(str(m.get("content", ""))) for m in messages)
+    return chars // 4 + settings.llm_output_tokens_estimate
+
+
+def _script(redis: Redis, name: str, source: str):
+    key = (id(redis), name)
+    if key not in _scripts:
+        _scripts[key] = redis.register_script(source)
+    return _scripts[key]
+
+
+async def _take_rate(redis: Redis, model: str, rps: float, tpm: int, tokens: int):
+    buckets = _script(redis, "buckets", _BUCKETS_LUA)
+    request_burst = max(1.0, rps)
+    keys = [f"llm:rl:{model}:req", f"llm:rl:{model}:tok"]
+    args = [rps / 1000, request_burst, 1, tpm / 60_000, tpm, min(tokens, tpm)]
+    while True:
+        wait_ms = await buckets(keys=keys, args=args)
+        if not wait_ms:
+            return
+        await asyncio.sleep(wait_ms / 1000)
+
+
+async def _take_slot(redis: Redis, model: str, limit: int) -> str:
+    slots = _script(redis, "slot", _SLOT_LUA)
+    lease = uuid.uuid4().hex
+    lease_ms = (settings.llm_timeout + 30) * 1000
+    delay = SLOT_POLL_MIN
+    while not await slots(keys=[f"llm:rl:{model}:slots"], args=[limit, lease_ms, lease]):
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, SLOT_POLL_MAX)
+    return lease
+
+
+@asynccontextmanager
+async def limit(provider: str, model: str, messages: list[dict]) -> AsyncIterator[None]:
+    """Hold a concurrency slot and rate budget for one call to model."""
+    if not settings.llm_rate_limit_enabled:
+        yield
+        return
+
+    from app.main import get_redis
+
+    redis = await get_redis()
+    rps, tpm, concurrency = _limits(provider)
+    lease = None
+    try:
+        async with _queues.setdefault(model, asyncio.Lock()):
+            lease = await _take_slot(redis, model, concurrency)
+            await _take_rate(redis, model, rps, tpm, estimate_tokens(messages))
+    except asyncio.CancelledError:
+        if lease is not None:
+            await _release(redis, model, lease)
+        raise
+    except Exception as e:
+        if lease is not None:
+            await _release(redis, model, lease)
+            lease = None
+        logger.warning(
+            "LLM rate limiter unavailable, continuing",
+            model=model,
+            error=str(e),
+            sampled=True,
+        )
+
+    try:
+        yield
+    finally:
+        if lease is not None:
+            await _release(redis, model, lease)
+
+
+async def _release(redis: Redis, model: str, lease: str):
+    try:
+        await redis.zrem(f"llm:rl:{model}:slots", lease)
+    except Exception as e:
+        logger.warning("LLM rate limiter release failed", model=model, error=str(e), sampled=True)
@@ -0,0 +1,68 @@
+"""Recompute overall scores and bands for historical results, e.g. after a
+change to BAND_THRESHOLDS.
+
+Reads JSON lines shaped like grading:results payloads (submissionId plus a
+camelCase Result, of which only criteriaScores is used) and writes each line
+back with overallScore and band recomputed. Lines without criteria scores,
+such as {"submissionId": ..., "failed": true}, are passed through untouched. Lines are scored in chunks with one
+vectorized call each, so memory stays flat for any file size.
+
+    python -m app.rescore results.jsonl -o rescored.jsonl
+"""
+
+import argparse
+import json
+import sys
+from collections.abc import Iterator
+from itertools import islice
+
+import numpy as np
+
+from app.scoring import score_batch
+
+CHUNK_SIZE = 10_000
+
+
+def _chunks(lines, size: int) -> Iterator[list[dict]]:
+    records = (json.loads(line) for line in lines if line.strip())
+    while chunk := list(islice(records, size)):
+        yield chunk
+
+
+def rescore(records: list[dict]) -> int:
+    """Update records that carry criteria scores in place; returns how many changed band."""
+    scored = [r for r in records if r.get("criteriaScores")]
+    if not scored:
+        return 0
+    width = max(len(r["criteriaScores"]) for r in scored)
+    criteria = np.full((len(scored), width), np.nan)
+    for row, record in zip(criteria, scored):
+        scores = list(record["criteriaScores"].values())
+        row[: len(scores)] = scores
+
+    overall, bands = score_batch(criteria)
+    changed = 0
+    for record, score, band in zip(scored, overall.tolist(), bands):
+        changed += record.get("band") != band
+        record["overallScore"] = score
+        record["band"] = band
+    return changed
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("input", type=argparse.FileType("r"), help="JSONL of results, - for stdin")
+    parser.add_argument("-o", "--output", type=argparse.FileType("w"), default=sys.stdout)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    total = changed = 0
+    for chunk in _chunks(args.input, args.chunk_size):
+        changed += rescore(chunk)
+        total += len(chunk)
+        args.output.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in chunk)
+    print(f"rescored {total} results, {changed} changed band", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,13 @@
+import numpy as np
+
 BAND_THRESHOLDS = {"C1": 8.5, "B2": 6.0, "B1": 4.0}
 
+# Ascending thresholds and the band for "at or above i thresholds", for searchsorted.
+_THRESHOLDS = np.array(sorted(BAND_THRESHOLDS.values()))
+_BANDS = np.array(
+    [None, *sorted(BAND_THRESHOLDS, key=BAND_THRESHOLDS.get)], dtype=object
+)
+
 
 def to_band(score: float) -> str | None:
     for band, threshold in BAND_THRESHOLDS.items():
@@ -11,3 +19,30 @@ def to_band(score: float) -> str | None:
 def snap(score: float) -> float:
     """Snap score to nearest 0.5 increment."""
     return round(score * 2) / 2
+
+
+def to_bands(scores: np.ndarray) -> np.ndarray:
+    """Vectorized to_band: object array of band names (None below B1 or for NaN)."""
+    scores = np.asarray(scores, dtype=float)
+    # searchsorted sorts NaN above every threshold, which would read as C1.
+    index = np.searchsorted(_THRESHOLDS, scores, side="right")
+    return _BANDS[np.where(np.isnan(scores), 0, index)]
+
+
+def snap_all(scores: np.ndarray) -> np.ndarray:
+    """Vectorized snap; np.round rounds halves to even, like round()."""
+    return np.round(np.asarray(scores, dtype=float) * 2) / 2
+
+
+def score_batch(criteria: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Overall scores and bands for an (n, criteria) array of criterion scores.
+
+    Rows may be NaN-padded when records have fewer criteria; a row with no
+    scores at all gets a NaN overall score and no band.
+    """
+    criteria = np.asarray(criteria, dtype=float)
+    counts = np.sum(~np.isnan(criteria), axis=1)
+    totals = np.nansum(criteria, axis=1)
+    means = np.divide(totals, counts, out=np.full(len(criteria), np.nan), where=counts > 0)
+    overall = snap_all(means)
+    return overall, to_bands(overall)
@@ -1,9 +1,14 @@
+import asyncio
+import time
 from datetime import datetime, timezone
 
-from app.llm import complete
-from app.models import Result, SpeakingScore, Task
-from app.prompts import speaking as speaking_prompt
+from redis.asyncio import Redis
+
+from app.llm import complete_model
+from app.models import Result, SpeakingPart, SpeakingScore, Task
+from app.prompts import SPEAKING_VERSION, speaking as speaking_prompt
 from app.scoring import snap, to_band
+from app.stt import transcribe
 
 SPEAKING_CRITERIA = {
     "fluencyOrganization": "fluency_organization",
@@ -12,8 +17,11 @@ SPEAKING_CRITERIA = {
     "grammar": "grammar",
 }
 
+STAGES = ("download_ms", "stt_ms", "llm_ms")
+CONFIDENCE_ORDER = ("low", "medium", "high")
+
 
-def to_result(score: SpeakingScore) -> Result:
+def to_result(score: SpeakingScore, prompt_version: str | None = None) -> Result:
     criteria = {
         name: getattr(score, attr) for name, attr in SPEAKING_CRITERIA.items()
     }
@@ -27,12 +35,52 @@ def to_result(score: SpeakingScore) -> Result:
         feedback=score.feedback,
         confidence=score.confidence,
         gradedAt=datetime.now(timezone.utc).isoformat(),
+        promptVersion=prompt_version,
+    )
+
+
+def combine(parts: list[tuple[SpeakingPart, SpeakingScore]]) -> SpeakingScore:
+    """Average criteria over parts (snapped to 0.5); feedback per part, weakest confidence."""
+    if len(parts) == 1:
+        return parts[0][1]
+    scores = [score for _, score in parts]
+    return SpeakingScore(
+        **{
+            attr: snap(sum(getattr(s, attr) for s in scores) / len(scores))
+            for attr in SPEAKING_CRITERIA.values()
+        },
+        feedback="\n\n".join(f"Part {part.part_number}: {score.feedback}" for part, score in parts),
+        confidence=min((s.confidence for s in scores), key=CONFIDENCE_ORDER.index),
     )
 
 
-async def grade(task: Task) -> Result:
-    answer = task.speaking_answer()
-    prompt = speaking_prompt(answer.transcript, answer.part_number)
-    content = await complete([{"role": "user", "content": prompt}])
-    score = SpeakingScore.model_validate_json(content)
-    return to_result(score)
+async def _grade_part(part: SpeakingPart, redis: Redis) -> tuple[SpeakingScore, dict]:
+    timings: dict[str, float] = {}
+    transcript = part.transcript
+    if transcript is None:
+        transcript = await transcribe(part.audio_url, redis, timings)
+
+    start = time.perf_counter()
+    messages = speaking_prompt(transcript, part.part_number)
+    score = await complete_model(messages, SpeakingScore, cache_version=SPEAKING_VERSION)
+    timings["llm_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return score, timings
+
+
+async def grade(task: Task, redis: Redis) -> Result:
+    """Transcribe (where needed) and grade every part concurrently.
+
+    timings holds each stage's slowest part, since parts run in parallel.
+    """
+    start = time.perf_counter()
+    parts = task.speaking_answer().segments()
+    graded = await asyncio.gather(*(_grade_part(part, redis) for part in parts))
+
+    result = to_result(
+        combine([(part, score) for part, (score, _) in zip(parts, graded)]), SPEAKING_VERSION
+    )
+    result.timings = {
+        stage: max(timings.get(stage, 0.0) for _, timings in graded) for stage in STAGES
+    }
+    result.timings["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
@@ -1,51 +1,245 @@
+"""Speech-to-text for speaking answers.
+
+Audio is streamed from object storage straight into the STT request in fixed
+size chunks, hashing as it goes, so a grade never holds the whole recording in
+memory. Transcripts are cached under stt:{sha256 of the audio}.
+
+A second index, stt:url:{sha256 of the URL without presigning parameters},
+maps the object's validator (ETag, or Last-Modified plus length) to that
+content key. A cheap HEAD is enough to serve a cached transcript without
+downloading the audio; a changed validator means the object was replaced and
+the entry is dropped.
+"""
+
+import asyncio
 import hashlib
+import json
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 import httpx
 from redis.asyncio import Redis
 
+from app import http_client, metrics, tracing
 from app.config import settings
 from app.logger import logger
 
 CACHE_TTL = 86400
+TIMEOUT = 120
+CHUNK_SIZE = 64 * 1024
 
+# Query parameters that sign a presigned URL (S3 / GCS / CloudFront / Azure SAS)
+# and change on every request without changing the object.
+SIGNATURE_PREFIXES = ("x-amz-", "x-goog-")
+SIGNATURE_PARAMS = frozenset(
+    "awsaccesskeyid signature expires key-pair-id policy googleaccessid "
+    "sig se st sv sp spr sr srt ss skoid sktid skt ske sks skv".split()
+)
 
-async def load_audio(url: str) -> bytes:
-    async with httpx.AsyncClient(timeout=120) as client:
-        response = await client.get(url)
-        response.raise_for_status()
-        return response.content
+_slots = asyncio.Semaphore(settings.stt_concurrency)
+
+
+class STTError(Exception):
+    """The STT endpoint rejected or failed the request; always worth retrying."""
+
+
+class AudioStream:
+    """Async iterable over a download that hashes every chunk it yields."""
+
+    def __init__(self, response: httpx.Response):
+        self.response = response
+        self.length = response.headers.get("content-length")
+        self.validator = _validator(response.headers)
+        self.size = 0
+        self.finished = asyncio.Event()
+        self._sha256 = hashlib.sha256()
+        self._opened = time.perf_counter()
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.response.aiter_bytes(CHUNK_SIZE):
+            self._sha256.update(chunk)
+            self.size += len(chunk)
+            yield chunk
+        self.finished.set()
+        metrics.AUDIO_DOWNLOAD_SECONDS.observe(time.perf_counter() - self._opened)
+        metrics.AUDIO_DOWNLOAD_BYTES.observe(self.size)
+
+    @property
+    def cache_key(self) -> str:
+        """Only meaningful once the stream is finished."""
+        return f"stt:{self._sha256.hexdigest()}"
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def _validator(headers: httpx.Headers) -> str | None:
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    modified = headers.get("last-modified")
+    length = headers.get("content-range", "").rpartition("/")[2] or headers.get("content-length")
+    if modified and length and length != "*":
+        return f"{modified}|{length}"
+    return None
+
+
+def unsigned_url(url: str) -> str:
+    """url without its presigning parameters; other query parameters are kept."""
+    parts = urlsplit(url)
+    query = [
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in SIGNATURE_PARAMS and not name.lower().startswith(SIGNATURE_PREFIXES)
+    ]
+    return urlunsplit(parts._replace(query=urlencode(query), fragment=""))
 
 
-async def transcribe(audio_url: str, redis: Redis) -> str:
-    audio = await load_audio(audio_url)
+def _index_key(url: str) -> str:
+    # Presigned URLs carry a fresh signature on every request, so that is not
+    # part of the identity; other parameters (versionId, a CDN's resize or
+    # format options) can name different bytes and are kept.
+    return f"stt:url:{hashlib.sha256(unsigned_url(url).encode()).hexdigest()}"
 
-    key = f"stt:{hashlib.sha256(audio).hexdigest()}"
-    cached = await redis.get(key)
-    if cached:
-        return cached.decode()
 
+async def probe_audio(url: str) -> str | None:
+    """Fetch the object's validator without its body (HEAD, or a 1-byte range GET)."""
+    client = http_client.get_client()
+    try:
+        response = await client.head(url, timeout=TIMEOUT)
+        if response.status_code in (403, 405):
+            # URLs presigned for GET only reject HEAD.
+            response = await client.get(url, headers={"Range": "bytes=0-0"}, timeout=TIMEOUT)
+        if not response.is_success:
+            return None
+        return _validator(response.headers)
+    except httpx.HTTPError as e:
+        logger.warning("audio probe failed", audio_url=url, error=str(e), sampled=True)
+        return None
+
+
+async def _cached_by_url(url: str, redis: Redis) -> str | None:
+    index_key = _index_key(url)
+    entry = await redis.get(index_key)
+    if entry is None:
+        return None
+    entry = json.loads(entry)
+    validator = await probe_audio(url)
+    if validator is None:
+        return None
+    if entry["validator"] != validator:
+        await redis.delete(index_key)
+        return None
+    transcript = await redis.get(entry["key"])
+    if transcript is None:
+        await redis.delete(index_key)
+    return transcript
+
+
+async def _remember_url(url: str, audio: "AudioStream", redis: Redis):
+    if audio.validator is None:
+        return
+    entry = json.dumps({"validator": audio.validator, "key": audio.cache_key})
+    await redis.setex(_index_key(url), CACHE_TTL, entry)
+
+
+@asynccontextmanager
+async def load_audio(url: str) -> AsyncIterator[AudioStream]:
+    with tracing.span("load_audio", audio_url=url) as span:
+        async with http_client.get_client().stream("GET", url, timeout=TIMEOUT) as response:
+            response.raise_for_status()
+            audio = AudioStream(response)
+            yield audio
+            span.set(bytes=audio.size, finished=audio.finished.is_set())
+
+
+async def _run_stt(audio: AudioStream) -> str:
     model = settings.stt_model.removeprefix("cloudflare/")
     url = f"{settings.stt_api_base}/run/{model}"
+    headers = {
+        "Authorization": f"Bearer {settings.stt_api_key}",
+        "Content-Type": "application/octet-stream",
+    }
+    if audio.length:
+        headers["Content-Length"] = audio.length
 
-    async with httpx.AsyncClient(timeout=120) as client:
-        response = await client.post(
+    with tracing.span("stt_request", model=model):
+        response = await http_client.get_client().post(
             url,
-            headers={
-                "Authorization": f"Bearer {settings.stt_api_key}",
-                "Content-Type": "application/octet-stream",
-            },
+            headers=headers,
             content=audio,
+            timeout=TIMEOUT,
         )
+    try:
         response.raise_for_status()
-        data = response.json()
-        result = data.get("result", {})
-        if "results" in result:
-            transcript = (
-                result["results"]["channels"][0]["alternatives"][0]["transcript"]
-            )
-        else:
-            transcript = result.get("text", "")
-
-    await redis.setex(key, CACHE_TTL, transcript)
-    logger.info("transcribed", audio_url=audio_url, length=len(transcript))
+    except httpx.HTTPStatusError as e:
+        raise STTError(f"STT request failed: {e}") from e
+    data = response.json()
+    result = data.get("result", {})
+    if "results" in result:
+        return result["results"]["channels"][0]["alternatives"][0]["transcript"]
+    return result.get("text", "")
+
+
+async def transcribe(
+    audio_url: str, redis: Redis, timings: dict[str, float] | None = None
+) -> str:
+    """Transcribe one recording. If given, timings receives download_ms and stt_ms.
+
+    Download and STT overlap, so download_ms is time to the last audio byte and
+    stt_ms is the whole call. At most stt_concurrency run at once per process.
+    """
+    timings = {} if timings is None else timings
+    with tracing.span("transcribe", audio_url=audio_url) as span:
+        transcript = await _transcribe(audio_url, redis, timings)
+        span.set(**timings)
+        return transcript
+
+
+async def _transcribe(audio_url: str, redis: Redis, timings: dict[str, float]) -> str:
+    start = time.perf_counter()
+    with tracing.span("stt_cache", by="url") as span:
+        cached = await _cached_by_url(audio_url, redis)
+        span.set(hit=cached is not None)
+    metrics.cache_lookup("stt_url", "miss" if cached is None else "hit").inc()
+    if cached is not None:
+        timings.update(download_ms=0.0, stt_ms=_elapsed_ms(start))
+        metrics.stt_latency("url_cache").observe(time.perf_counter() - start)
+        logger.info("transcript cache hit", audio_url=audio_url, source="url")
+        return cached
+
+    async with _slots, load_audio(audio_url) as audio:
+        upload = asyncio.create_task(_run_stt(audio))
+        finished = asyncio.create_task(audio.finished.wait())
+        try:
+            await asyncio.wait({upload, finished}, return_when=asyncio.FIRST_COMPLETED)
+            # Once the last chunk is hashed we know the cache key; on a hit the
+            # STT call is abandoned instead of waiting for it to finish.
+            if audio.finished.is_set():
+                timings["download_ms"] = _elapsed_ms(start)
+                with tracing.span("stt_cache", by="content") as span:
+                    cached = await redis.get(audio.cache_key)
+                    span.set(hit=cached is not None)
+                metrics.cache_lookup("stt_content", "miss" if cached is None else "hit").inc()
+                if cached is not None:
+                    timings["stt_ms"] = _elapsed_ms(start)
+                    metrics.stt_latency("content_cache").observe(time.perf_counter() - start)
+                    await _remember_url(audio_url, audio, redis)
+                    logger.info("transcript cache hit", audio_url=audio_url, source="content")
+                    return cached
+            transcript = await upload
+            timings.setdefault("download_ms", _elapsed_ms(start))
+            timings["stt_ms"] = _elapsed_ms(start)
+            metrics.stt_latency("stt").observe(time.perf_counter() - start)
+        finally:
+            for task in (upload, finished):
+                if not task.done():
+                    task.cancel()
+
+    await redis.setex(audio.cache_key, CACHE_TTL, transcript)
+    await _remember_url(audio_url, audio, redis)
+    logger.info("transcribed", audio_url=audio_url, length=len(transcript), bytes=audio.size)
     return transcript
@@ -0,0 +1,248 @@
+"""Redis Streams consumer for grading:tasks.
+
+Every replica joins the same consumer group, so each message is delivered to a
+single consumer. Within a replica a semaphore bounds concurrent grades and we
+only read as many messages as there are free slots, which keeps work spread
+across replicas instead of piling up in one consumer's pending list.
+
+Results go to grading:results in the shape backend's grading consumer expects,
+and are written atomically with the XACK. Transient failures stay pending and
+are reclaimed with XAUTOCLAIM once idle; after worker_max_deliveries they are
+dead-lettered like permanent errors. While a grade runs, a heartbeat re-claims
+its message for this consumer every HEARTBEAT_INTERVAL seconds, so however
+long the grade takes (LLM retries, STT, fallback) the message never looks idle
+and another replica does not grade it a second time.
+
+Run standalone with `python -m app.worker`, or set WORKER_ENABLED=true to run
+it inside the API process.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import time
+
+from pydantic import ValidationError
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from app import http_client
+from app.config import settings
+from app.grading import grade
+from app.logger import logger
+from app.models import PermanentError, Result, Task
+
+TASKS_STREAM = "grading:tasks"
+RESULTS_STREAM = "grading:results"
+DEAD_LETTER = "grading:dead-letter"
+GROUP = "grading"
+CLAIM_INTERVAL = 30
+HEARTBEAT_INTERVAL = 30
+
+
+async def ensure_group(redis: Redis):
+    try:
+        await redis.xgroup_create(TASKS_STREAM, GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+class Worker:
+    def __init__(self, redis: Redis, consumer: str | None = None, concurrency: int | None = None):
+        self.redis = redis
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.concurrency = concurrency or settings.worker_concurrency
+        self.slots = asyncio.Semaphore(self.concurrency)
+        self.inflight: set[asyncio.Task] = set()
+        self.handling: set[str] = set()
+        self.running = False
+        self._next_claim = 0.0
+        self._heartbeat_task: asyncio.Task | None = None
+
+    async def run(self):
+        await ensure_group(self.redis)
+        self.running = True
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        logger.info(
+            "grading worker started",
+            consumer=self.consumer,
+            concurrency=self.concurrency,
+        )
+        while self.running:
+            free = await self._acquire_slots()
+            try:
+                messages = await self._claim(free) or await self._read(free)
+            except asyncio.CancelledError:
+                self._release(free)
+                raise
+            except Exception as e:
+                self._release(free)
+                logger.error("grading worker read failed", error=str(e))
+                await asyncio.sleep(1)
+                continue
+
+            self._release(free - len(messages))
+            for message_id, fields in messages:
+                job = asyncio.create_task(self._handle(message_id, fields))
+                self.inflight.add(job)
+                job.add_done_callback(self.inflight.discard)
+
+    async def stop(self):
+        self.running = False
+        if self.inflight:
+            await asyncio.gather(*self.inflight, return_exceptions=True)
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+
+    async def _acquire_slots(self) -> int:
+        await self.slots.acquire()
+        free = 1
+        while free < self.concurrency and not self.slots.locked():
+            await self.slots.acquire()
+            free += 1
+        return free
+
+    def _release(self, n: int):
+        for _ in range(n):
+            self.slots.release()
+
+    async def _read(self, count: int) -> list:
+        response = await self.redis.xreadgroup(
+            GROUP,
+            self.consumer,
+            {TASKS_STREAM: ">"},
+            count=count,
+            block=settings.worker_block_ms,
+        )
+        return [msg for _, messages in response or [] for msg in messages]
+
+    async def _claim(self, count: int) -> list:
+        """Take over messages left pending by crashed consumers or transient failures."""
+        now = time.monotonic()
+        if now < self._next_claim:
+            return []
+        self._next_claim = now + CLAIM_INTERVAL
+        _, messages, *_ = await self.redis.xautoclaim(
+            TASKS_STREAM,
+            GROUP,
+            self.consumer,
+            min_idle_time=settings.worker_claim_idle_ms,
+            start_id="0-0",
+            count=count,
+        )
+        return [(message_id, fields) for message_id, fields in messages if fields]
+
+    async def _heartbeat(self):
+        """Reset the idle time of messages being graded so XAUTOCLAIM leaves them be."""
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            if not self.handling:
+                continue
+            try:
+                await self.redis.xclaim(
+                    TASKS_STREAM,
+                    GROUP,
+                    self.consumer,
+                    min_idle_time=0,
+                    message_ids=list(self.handling),
+                    justid=True,
+                )
+            except Exception as e:
+                logger.warning("grading worker heartbeat failed", error=str(e), sampled=True)
+
+    async def _handle(self, message_id: str, fields: dict):
+        self.handling.add(message_id)
+        try:
+            payload = fields.get("payload", "")
+            try:
+                task = Task.model_validate_json(payload)
+            except ValidationError as e:
+                # Still tell the backend if we can tell which submission it was,
+                # or it stays "processing" forever.
+                await self._dead_letter(
+                    message_id, payload, f"invalid task payload: {e}", _submission_id(payload)
+                )
+                return
+
+            try:
+                result = await grade(task, self.redis)
+            except PermanentError as e:
+                await self._dead_letter(message_id, payload, str(e), task.submission_id)
+                return
+            except Exception as e:
+                deliveries = await self._deliveries(message_id)
+                logger.warning(
+                    "grading failed",
+                    submission_id=task.submission_id,
+                    deliveries=deliveries,
+                    error=str(e),
+                )
+                if deliveries >= settings.worker_max_deliveries:
+                    await self._dead_letter(message_id, payload, str(e), task.submission_id)
+                return
+
+            await self._complete(message_id, task, result)
+        except Exception as e:
+            logger.error("grading worker failed to settle message", message_id=message_id, error=str(e))
+        finally:
+            self.handling.discard(message_id)
+            self.slots.release()
+
+    async def _deliveries(self, message_id: str) -> int:
+        pending = await self.redis.xpending_range(
+            TASKS_STREAM, GROUP, min=message_id, max=message_id, count=1
+        )
+        return pending[0]["times_delivered"] if pending else 1
+
+    async def _complete(self, message_id: str, task: Task, result: Result):
+        payload = {"submissionId": task.submission_id, **result.model_dump(by_alias=True)}
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.xadd(RESULTS_STREAM, {"payload": json.dumps(payload)})
+            pipe.xack(TASKS_STREAM, GROUP, message_id)
+            await pipe.execute()
+        logger.info("graded", submission_id=task.submission_id, score=result.overall_score)
+
+    async def _dead_letter(
+        self, message_id: str, payload: str, error: str, submission_id: str | None
+    ):
+        entry = {"id": message_id, "payload": payload, "error": error}
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.lpush(DEAD_LETTER, json.dumps(entry))
+            if submission_id:
+                failure = {"submissionId": submission_id, "failed": True}
+                pipe.xadd(RESULTS_STREAM, {"payload": json.dumps(failure)})
+            pipe.xack(TASKS_STREAM, GROUP, message_id)
+            await pipe.execute()
+        logger.warning("dead-lettered", message_id=message_id, submission_id=submission_id, error=error)
+
+
+def _submission_id(payload: str) -> str | None:
+    """submissionId from a payload that didn't validate as a Task, if it has one."""
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        return None
+    submission_id = data.get("submissionId") if isinstance(data, dict) else None
+    return submission_id if isinstance(submission_id, str) and submission_id else None
+
+
+async def main():
+    redis = Redis.from_url(settings.redis_url, decode_responses=True)
+    worker = Worker(redis)
+    try:
+        await worker.run()
+    finally:
+        await worker.stop()
+        await http_client.aclose()
+        await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,8 +1,8 @@
 from datetime import datetime, timezone
 
-from app.llm import complete
+from app.llm import complete_model
 from app.models import Result, Task, WritingScore
-from app.prompts import writing as writing_prompt
+from app.prompts import WRITING_VERSION, writing as writing_prompt
 from app.scoring import snap, to_band
 
 WRITING_CRITERIA = {
@@ -13,7 +13,7 @@ WRITING_CRITERIA = {
 }
 
 
-def to_result(score: WritingScore) -> Result:
+def to_result(score: WritingScore, prompt_version: str | None = None) -> Result:
     criteria = {
         name: getattr(score, attr) for name, attr in WRITING_CRITERIA.items()
     }
@@ -27,6 +27,7 @@ def to_result(score: WritingScore) -> Result:
         feedback=score.feedback,
         confidence=score.confidence,
         gradedAt=datetime.now(timezone.utc).isoformat(),
+        promptVersion=prompt_version,
     )
 
 
@@ -35,7 +36,6 @@ async def grade(task: Task) -> Result:
     text = answer.text
     task_type = answer.task_type
 
-    prompt = writing_prompt(text, task_type)
-    content = await complete([{"role": "user", "content": prompt}])
-    score = WritingScore.model_validate_json(content)
-    return to_result(score)
+    messages = writing_prompt(text, task_type)
+    score = await complete_model(messages, WritingScore, cache_version=WRITING_VERSION)
+    return to_result(score, WRITING_VERSION)
@@ -0,0 +1,74 @@
+"""Micro-benchmark: regex extract_json + model_validate vs. parse_model.
+
+    python -m benchmarks.json_extract
+"""
+
+import json
+import re
+import timeit
+
+from app.ai_routes import ExplainResponse
+from app.json_extract import parse_model
+from app.models import WritingScore
+
+
+def regex_extract_json(text: str) -> dict:
+    """The previous ai_routes.extract_json."""
+    match = re.search(r"```(?:json)?\s*({.*?})\s*```", text, re.DOTALL)
+    if match:
+        return json.loads(match.group(1))
+    match = re.search(r"({.*})", text, re.DOTALL)
+    if match:
+        return json.loads(match.group(1))
+    return json.loads(text)
+
+
+SCORE = json.dumps(
+    {
+        "task_fulfillment": 7,
+        "organization": 6.5,
+        "vocabulary": 7,
+        "grammar": 6,
+        "feedback": "Good structure. " * 40,
+        "confidence": "high",
+    }
+)
+EXPLAIN = json.dumps(
+    {
+        "highlights": [
+            {"phrase": f"phrase {i}", "note": "ghi chú {tiếng Việt} " * 5, "category": "vocabulary"}
+            for i in range(60)
+        ],
+        "questionExplanations": None,
+    }
+)
+
+CASES = {
+    "writing, bare": (SCORE, WritingScore),
+    "writing, fenced + prose": (f"Sure! Here is the grade:\n```json\n{SCORE}\n```\nGood luck.", WritingScore),
+    # Braces in the prose: the first-to-last span fails and the scan runs.
+    "writing, braces in prose": (f"Scores {{draft}} first, then:\n{SCORE}\nDone {{ok}}.", WritingScore),
+    "explain, long fenced": (f"```json\n{EXPLAIN}\n```", ExplainResponse),
+    # Closing brace followed by a long tail: the greedy ({.*}) pattern scans to
+    # the end and backtracks.
+    "explain, long trailing prose": (EXPLAIN + "\nNotes: " + "x" * 20_000, ExplainResponse),
+}
+
+
+def main():
+    for name, (text, model) in CASES.items():
+        number = 2000
+        parse = timeit.timeit(lambda: parse_model(text, model), number=number)
+        try:
+            regex = timeit.timeit(lambda: model.model_validate(regex_extract_json(text)), number=number)
+        except ValueError:
+            print(f"{name:32} regex   failed      parse {parse / number * 1e6:8.1f} us")
+            continue
+        print(
+            f"{name:32} regex {regex / number * 1e6:8.1f} us   "
+            f"parse {parse / number * 1e6:8.1f} us   x{regex / parse:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
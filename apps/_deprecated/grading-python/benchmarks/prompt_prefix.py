@@ -0,0 +1,127 @@
+"""Cacheable prompt prefix: previous single-message prompts vs. system + user pairs.
+
+Provider prompt caches reuse the longest prefix a request shares with an
+earlier one. For a mixed stream of writing and speaking grades this reports,
+per layout, how many input tokens (estimated at ~4 chars each) sit in a
+prefix already seen.
+
+    python -m benchmarks.prompt_prefix
+"""
+
+import os
+import random
+
+from app import prompts
+
+WORDS = "the students believe that technology has changed how people learn and work every day".split()
+TASK_TYPES = ["letter", "essay"]
+
+
+def previous_writing(text: str, task_type: str) -> list[dict]:
+    """writing-v1: the student text sat between the rubric and the instructions."""
+    return [{"role": "user", "content": f"""You are a VSTEP writing examiner. Grade the following {task_type} using the VSTEP writing rubric.
+
+## Rubric (each criterion 0-10, use 0.5 increments)
+
+- **Task Fulfillment**: How well the response fulfills the task requirements. Relevance, completeness, and development of ideas.
+- **Organization**: Logical organization, paragraphing, use of cohesive devices, and overall flow.
+- **Vocabulary**: Range and accuracy of vocabulary. Appropriateness of word choice and collocations.
+- **Grammar**: Variety and correctness of grammatical structures. Control of complex sentences.
+
+## Student Response
+
+{text}
+
+## Instructions
+
+Evaluate the response against each criterion. Provide constructive feedback highlighting strengths and areas for improvement. Assess your own confidence in the grading accuracy.
+
+Respond with ONLY valid JSON matching this schema:
+{{
+  "task_fulfillment": <float 0-10>,
+  "organization": <float 0-10>,
+  "vocabulary": <float 0-10>,
+  "grammar": <float 0-10>,
+  "feedback": "<constructive feedback as a single string>",
+  "confidence": "<high|medium|low>"
+}}"""}]
+
+
+def previous_speaking(transcript: str, part_number: int) -> list[dict]:
+    """speaking-v1: part context near the top, transcript mid-prompt."""
+    context = prompts.SPEAKING_PART_CONTEXT[part_number]
+    return [{"role": "user", "content": f"""You are a VSTEP speaking examiner. Grade the following spoken response transcript using the VSTEP speaking rubric.
+
+{context}
+
+## Rubric (each criterion 0-10, use 0.5 increments)
+
+- **Fluency & Organization**: Natural pace, minimal hesitation, self-correction ability. Logical organization of ideas in speech.
+- **Pronunciation**: Clarity of individual sounds, word stress, intonation patterns, and overall intelligibility.
+- **Grammar**: Variety and correctness of grammatical structures in spoken language.
+- **Vocabulary**: Range and precision of vocabulary. Use of topic-specific and academic language.
+
+## Transcript
+
+{transcript}
+
+## Instructions
+
+Evaluate the transcript against each criterion. Account for the fact this is spoken language transcribed to text. Provide constructive feedback. Assess your own confidence in the grading accuracy.
+
+Respond with ONLY valid JSON matching this schema:
+{{
+  "fluency_organization": <float 0-10>,
+  "pronunciation": <float 0-10>,
+  "grammar": <float 0-10>,
+  "vocabulary": <float 0-10>,
+  "feedback": "<constructive feedback as a single string>",
+  "confidence": "<high|medium|low>"
+}}"""}]
+
+
+def serialize(messages: list[dict]) -> str:
+    return "".join(f"<{m['role']}>{m['content']}" for m in messages)
+
+
+def common_prefix(a: str, b: str) -> int:
+    return len(os.path.commonprefix([a, b]))
+
+
+def requests(count: int, seed: int = 7) -> list[tuple[str, str, object]]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(count):
+        text = " ".join(rng.choices(WORDS, k=rng.randint(120, 350)))
+        if rng.random() < 0.5:
+            out.append(("writing", text, rng.choice(TASK_TYPES)))
+        else:
+            out.append(("speaking", text, rng.randint(1, 3)))
+    return out
+
+
+def measure(layout: dict, stream: list) -> tuple[float, float]:
+    """(average cached prefix in tokens, share of input tokens cached)."""
+    seen: list[str] = []
+    cached = total = 0
+    for skill, text, arg in stream:
+        prompt = serialize(layout[skill](text, arg))
+        cached += max((common_prefix(prompt, earlier) for earlier in seen), default=0)
+        total += len(prompt)
+        seen.append(prompt)
+    return cached / 4 / len(stream), cached / total
+
+
+def main():
+    stream = requests(200)
+    layouts = {
+        "v1 single message": {"writing": previous_writing, "speaking": previous_speaking},
+        "v2 system + user": {"writing": prompts.writing, "speaking": prompts.speaking},
+    }
+    for name, layout in layouts.items():
+        tokens, share = measure(layout, stream)
+        print(f"{name:20} cached prefix {tokens:6.0f} tokens/request   {share:6.1%} of input")
+
+
+if __name__ == "__main__":
+    main()
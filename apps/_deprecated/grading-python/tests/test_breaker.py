@@ -0,0 +1,103 @@
+from app.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_breaker(clock: FakeClock) -> CircuitBreaker:
+    return CircuitBreaker("test", window=60, min_requests=4, error_rate=0.5, cooldown=30, clock=clock)
+
+
+def test_opens_after_error_rate_threshold():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_needs_min_requests_before_opening():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_lets_one_probe_through():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+
+    clock.now = 31
+    assert breaker.available()
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success(0.2)
+    assert breaker.state == CLOSED
+    assert breaker.error_rate() == 0
+
+
+def test_failed_probe_reopens():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+
+    clock.now = 31
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_old_outcomes_leave_window():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.now = 61
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert breaker.error_rate() == 1.0
+
+
+def test_latency_ewma():
+    breaker = make_breaker(FakeClock())
+    breaker.record_success(1.0)
+    breaker.record_success(2.0)
+    assert abs(breaker.latency_ewma - 1.2) < 1e-9
+
+
+def test_latency_percentile():
+    breaker = make_breaker(FakeClock())
+    assert breaker.latency_percentile(0.95) is None
+
+    for ms in range(1, 101):
+        breaker.record_success(ms / 1000)
+    assert breaker.latency_percentile(0.95) == 0.095
+    assert breaker.latency_percentile(0.5) == 0.05
+    assert breaker.latency_percentile(0.95, min_samples=200) is None
+
+
+def test_abandoned_call_latency_counts_towards_percentiles():
+    breaker = make_breaker(FakeClock())
+    for _ in range(9):
+        breaker.record_success(1.0)
+    breaker.record_latency(5.0)
+    assert breaker.latency_percentile(0.95) == 5.0
+    assert breaker.snapshot()["requests"] == 9
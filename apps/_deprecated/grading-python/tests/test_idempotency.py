@@ -0,0 +1,231 @@
+import asyncio
+
+import pytest
+
+from app import idempotency
+from app.idempotency import CHANNEL_PREFIX, LOCK_PREFIX, RESULT_PREFIX, once, task_key
+from app.models import PermanentError, Result, Task
+
+
+def make_task(**overrides) -> Task:
+    data = {
+        "submissionId": "sub-1",
+        "questionId": "q-1",
+        "skill": "writing",
+        "answer": {"text": "Dear Sir,", "taskType": "letter"},
+        "dispatchedAt": "2025-01-01T00:00:00Z",
+    }
+    return Task.model_validate({**data, **overrides})
+
+
+def test_key_ignores_dispatch_time_and_answer_key_order():
+    key = task_key(make_task())
+    assert key == task_key(make_task(dispatchedAt="2025-01-01T00:05:00Z"))
+    assert key == task_key(make_task(answer={"taskType": "letter", "text": "Dear Sir,"}))
+
+
+def test_key_depends_on_submission_question_and_answer():
+    key = task_key(make_task())
+    assert key != task_key(make_task(submissionId="sub-2"))
+    assert key != task_key(make_task(questionId="q-2"))
+    assert key != task_key(make_task(answer={"text": "Dear Madam,", "taskType": "letter"}))
+
+
+def test_key_ignores_presigning_parameters():
+    def speaking(url: str) -> Task:
+        return make_task(skill="speaking", answer={"parts": [{"audioUrl": url, "partNumber": 1}]})
+
+    base = "https://bucket.s3.amazonaws.com/a/1.webm"
+    signed = f"{base}?versionId=3&X-Amz-Signature=abc&X-Amz-Date=20250101T000000Z"
+    resigned = f"{base}?versionId=3&X-Amz-Signature=def&X-Amz-Date=20250101T000500Z"
+    assert task_key(speaking(signed)) == task_key(speaking(resigned))
+    assert task_key(speaking(signed)) != task_key(speaking(f"{base}?versionId=4&X-Amz-Signature=abc"))
+
+
+class FakePubSub:
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_exc):
+        for queues in self.redis.channels.values():
+            queues.discard(self.queue)
+
+    async def subscribe(self, channel: str):
+        self.redis.channels.setdefault(channel, set()).add(self.queue)
+
+    async def get_message(self, ignore_subscribe_messages: bool, timeout: float):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_exc):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*a, **kw) for name, a, kw in self.calls]
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio.Redis for idempotency.once (TTLs not modelled)."""
+
+    def __init__(self):
+        self.data: dict[str, str] = {}
+        self.channels: dict[str, set[asyncio.Queue]] = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, nx=False, px=None, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+    async def pttl(self, key):
+        return 60_000 if key in self.data else -2
+
+    async def publish(self, channel, message):
+        for queue in self.channels.get(channel, ()):
+            queue.put_nowait({"type": "message", "data": message})
+        return len(self.channels.get(channel, ()))
+
+    async def eval(self, _script, _numkeys, key, token):
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+def make_result(score: float = 7.0) -> Result:
+    return Result(overallScore=score, criteriaScores={"grammar": score}, feedback="ok", confidence="high")
+
+
+class Runner:
+    def __init__(self, outcome):
+        self.calls = 0
+        self.outcome = outcome
+
+    async def __call__(self) -> Result:
+        self.calls += 1
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+async def hold_lock(redis: FakeRedis, key: str, token: str = "owner"):
+    await redis.set(LOCK_PREFIX + key, token)
+
+
+async def release_lock(redis: FakeRedis, key: str, result: str | None, message: str):
+    await idempotency._finish(redis, key, "owner", result, message)
+
+
+def test_returns_cached_result_without_grading():
+    task = make_task()
+    redis = FakeRedis()
+    redis.data[RESULT_PREFIX + task_key(task)] = make_result().model_dump_json(by_alias=True)
+    run = Runner(make_result(3.0))
+
+    result = asyncio.run(once(task, redis, run))
+    assert result.overall_score == 7.0
+    assert run.calls == 0
+
+
+def test_waits_for_owner_and_returns_its_result():
+    task = make_task()
+    key = task_key(task)
+    redis = FakeRedis()
+    run = Runner(make_result(3.0))
+
+    async def main():
+        await hold_lock(redis, key)
+        waiter = asyncio.create_task(once(task, redis, run))
+        while not redis.channels.get(CHANNEL_PREFIX + key):
+            await asyncio.sleep(0)
+        await release_lock(redis, key, make_result().model_dump_json(by_alias=True), "done")
+        return await waiter
+
+    assert asyncio.run(main()).overall_score == 7.0
+    assert run.calls == 0
+    assert LOCK_PREFIX + key not in redis.data
+
+
+def test_takes_over_when_owner_fails():
+    task = make_task()
+    key = task_key(task)
+    redis = FakeRedis()
+    run = Runner(make_result(6.5))
+
+    async def main():
+        await hold_lock(redis, key)
+        waiter = asyncio.create_task(once(task, redis, run))
+        while not redis.channels.get(CHANNEL_PREFIX + key):
+            await asyncio.sleep(0)
+        await release_lock(redis, key, None, "failed")
+        return await waiter
+
+    assert asyncio.run(main()).overall_score == 6.5
+    assert run.calls == 1
+    assert Result.model_validate_json(redis.data[RESULT_PREFIX + key]).overall_score == 6.5
+
+
+def test_permanent_error_reaches_waiters_but_is_not_stored():
+    task = make_task()
+    key = task_key(task)
+    redis = FakeRedis()
+    run = Runner(make_result())
+
+    async def main():
+        await hold_lock(redis, key)
+        waiter = asyncio.create_task(once(task, redis, run))
+        while not redis.channels.get(CHANNEL_PREFIX + key):
+            await asyncio.sleep(0)
+        await release_lock(redis, key, None, "permanent:audio download failed: 403")
+        return await waiter
+
+    with pytest.raises(PermanentError, match="403"):
+        asyncio.run(main())
+    assert run.calls == 0
+    assert RESULT_PREFIX + key not in redis.data
+
+
+def test_repush_after_expired_signature_is_regraded():
+    def speaking(signature: str) -> Task:
+        url = f"https://bucket.s3.amazonaws.com/a/1.webm?X-Amz-Signature={signature}"
+        return make_task(skill="speaking", answer={"audioUrl": url})
+
+    redis = FakeRedis()
+    expired = Runner(PermanentError("audio download failed: 403 Forbidden"))
+    fresh = Runner(make_result(6.0))
+
+    with pytest.raises(PermanentError):
+        asyncio.run(once(speaking("old"), redis, expired))
+    assert task_key(speaking("old")) == task_key(speaking("new"))
+    assert asyncio.run(once(speaking("new"), redis, fresh)).overall_score == 6.0
+    assert (expired.calls, fresh.calls) == (1, 1)
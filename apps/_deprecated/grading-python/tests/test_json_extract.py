@@ -0,0 +1,76 @@
+import pytest
+from pydantic import ValidationError
+
+from app.json_extract import ArrayItemScanner, find_object, iter_objects, parse_model
+from app.models import WritingScore
+
+SCORE = (
+    '{"task_fulfillment": 7, "organization": 6.5, "vocabulary": 7, "grammar": 6,'
+    ' "feedback": "Use {braces} and \\"quotes\\" carefully.", "confidence": "high"}'
+)
+
+
+def test_find_object_plain():
+    assert find_object(SCORE) == SCORE
+
+
+def test_find_object_in_fence():
+    assert find_object(f"```json\n{SCORE}\n```") == SCORE
+
+
+def test_find_object_ignores_braces_in_strings():
+    text = 'prefix {"a": "}{", "b": {"c": "\\\\"}} suffix }'
+    assert find_object(text) == '{"a": "}{", "b": {"c": "\\\\"}}'
+
+
+def test_find_object_incomplete():
+    assert find_object('{"a": 1') is None
+    assert find_object('{"a": "never closed}') is None
+    assert find_object("no json here") is None
+
+
+def test_iter_objects_successive():
+    text = 'Scores {draft} then {"k": 1}'
+    spans = [text[s:e] for s, e in iter_objects(text)]
+    assert spans == ["{draft}", '{"k": 1}']
+
+
+def test_parse_model_skips_non_matching_candidates():
+    score = parse_model(f"Here is {{my analysis}}:\n```json\n{SCORE}\n```", WritingScore)
+    assert score.organization == 6.5
+    assert score.feedback == 'Use {braces} and "quotes" carefully.'
+
+
+def test_parse_model_raises_validation_error():
+    with pytest.raises(ValidationError):
+        parse_model('{"task_fulfillment": 7}', WritingScore)
+    with pytest.raises(ValidationError):
+        parse_model("not json", WritingScore)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"a":' * 900 + '"' + "x" * 2_000_000,  # deep and unterminated
+        '{"a":' * 5000 + "1" + "}" * 5000,  # deep but complete
+        "{" * 100_000,
+    ],
+)
+def test_parse_model_rejects_deep_or_unterminated_input(text):
+    with pytest.raises(ValidationError):
+        parse_model(text, WritingScore)
+
+
+def test_array_item_scanner_yields_items_as_they_close():
+    text = (
+        '```json\n{"other": [{"x": 1}], "highlights": ['
+        '{"phrase": "a \\"}\\" b", "note": "n"}, {"phrase": "c", "note": "[d]"}'
+        '], "questionExplanations": null}\n```'
+    )
+    scanner = ArrayItemScanner("highlights")
+    items = []
+    for i in range(0, len(text), 3):
+        items += scanner.feed(text[i : i + 3])
+
+    assert items == ['{"phrase": "a \\"}\\" b", "note": "n"}', '{"phrase": "c", "note": "[d]"}']
+    assert scanner.text == text
@@ -0,0 +1,168 @@
+import asyncio
+import json
+
+import pytest
+
+from app import llm, tracing
+from app.breaker import HALF_OPEN
+from app.config import settings
+
+
+class FakeProvider(llm.Provider):
+    """Provider whose calls return (or raise) scripted outcomes after a delay."""
+
+    def __init__(self, name: str, outcomes: list = (), delay: float = 0.0, deltas: list[str] = ()):
+        super().__init__(name, f"openai/{name}", None, "http://llm.test", "key")
+        self.outcomes = list(outcomes)
+        self.delay = delay
+        self.deltas = list(deltas)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def call(self, messages, schema=None) -> str:
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else "{}"
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def stream(self, messages):
+        for delta in self.deltas:
+            await asyncio.sleep(0)
+            yield delta
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    def install(*items: FakeProvider):
+        monkeypatch.setattr(llm, "_providers", list(items))
+        return items
+
+    return install
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    """Enable hedging with a fresh budget; returns the stats dict it will update."""
+    monkeypatch.setattr(settings, "llm_hedge_enabled", True)
+    monkeypatch.setattr(llm, "_hedge_budget", llm._HedgeBudget())
+    stats = {"fired": 0, "won": 0, "over_budget": 0}
+    monkeypatch.setattr(llm, "hedge_stats", stats)
+    monkeypatch.setattr(llm, "_backoff", lambda attempt: 0)
+    return stats
+
+
+def warm_up(provider: FakeProvider, latency: float = 0.01):
+    """Give the provider enough latency samples for the hedge delay to be ~latency."""
+    for _ in range(settings.llm_hedge_min_samples):
+        provider.breaker.record_success(latency)
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(settings, "trace_file", str(path))
+    return path
+
+
+def read_spans(path) -> list[dict]:
+    tracing.flush()
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_stream_span_does_not_leak_into_the_consumer(providers, trace_file):
+    providers(FakeProvider("primary", deltas=["a", "b", "c"]))
+
+    async def main():
+        with tracing.span("request") as request:
+            seen = []
+            async for _ in llm.complete_stream([]):
+                seen.append(tracing.current())
+        return request, seen
+
+    request, seen = asyncio.run(main())
+    assert seen == [request] * 3
+    spans = {s["name"]: s for s in read_spans(trace_file)}
+    assert spans["llm.stream"]["parentSpanId"] == spans["request"]["spanId"]
+    assert spans["llm.stream"]["attributes"]["deltas"] == 3
+
+
+def test_abandoned_stream_closed_from_another_task(providers, trace_file):
+    providers(FakeProvider("primary", deltas=["a", "b", "c"]))
+
+    async def main():
+        with tracing.span("request"):
+            stream = llm.complete_stream([])
+            assert await anext(stream) == "a"
+        # The loop's async generator finalizer closes it from a different task.
+        await asyncio.create_task(stream.aclose())
+
+    asyncio.run(main())
+    spans = {s["name"]: s for s in read_spans(trace_file)}
+    assert spans["llm.stream"]["status"] == "error"
+    assert spans["llm.stream"]["parentSpanId"] == spans["request"]["spanId"]
+
+
+def test_hedge_fallback_wins_and_primary_is_cancelled(providers, hedging):
+    primary, backup = providers(
+        FakeProvider("primary", ['{"from": "primary"}'], delay=1),
+        FakeProvider("backup"),
+    )
+    warm_up(primary)
+    primary.breaker.state = HALF_OPEN  # the hedge claims the probe; cancelling must hand it back
+
+    answer = asyncio.run(llm._complete([], json.loads))
+
+    assert answer == ("{}", backup.model)
+    assert (primary.calls, primary.cancelled) == (1, 1)
+    assert not primary.breaker.probing
+    assert hedging == {"fired": 1, "won": 1, "over_budget": 0}
+    # The cancelled call still counts towards the primary's slow tail.
+    assert max(primary.breaker._latencies) >= 0.01
+
+
+def test_hedge_invalid_answer_falls_through_to_the_other_call(providers, hedging):
+    primary, backup = providers(
+        FakeProvider("primary", ['{"from": "primary"}'], delay=0.05),
+        FakeProvider("backup", ["not json"]),
+    )
+    warm_up(primary)
+
+    answer = asyncio.run(llm._complete([], json.loads))
+
+    assert answer == ('{"from": "primary"}', primary.model)
+    assert (primary.cancelled, backup.calls) == (0, 1)
+    assert hedging["won"] == 0
+
+
+def test_hedge_not_fired_when_budget_is_exhausted(providers, hedging, monkeypatch):
+    monkeypatch.setattr(settings, "llm_hedge_budget_per_minute", 0)
+    primary, backup = providers(FakeProvider("primary", delay=0.05), FakeProvider("backup"))
+    warm_up(primary)
+
+    answer = asyncio.run(llm._complete([], json.loads))
+
+    assert answer == ("{}", primary.model)
+    assert backup.calls == 0
+    assert hedging == {"fired": 0, "won": 0, "over_budget": 1}
+
+
+def test_failed_hedge_counts_towards_retries(providers, hedging):
+    failures = [RuntimeError("boom")] * (settings.llm_retries + 1)
+    primary, backup = providers(
+        FakeProvider("primary", failures, delay=0.05),
+        FakeProvider("backup", failures),
+    )
+    warm_up(primary)
+
+    with pytest.raises(llm.LLMError, match="boom"):
+        asyncio.run(llm._complete([], json.loads))
+
+    assert hedging["fired"] == 1
+    assert primary.calls == settings.llm_retries
+    assert backup.calls == settings.llm_retries
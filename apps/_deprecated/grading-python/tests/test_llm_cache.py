@@ -0,0 +1,62 @@
+import asyncio
+
+from app import llm_cache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data: dict[str, str] = {}
+
+    async def get(self, key: str) -> str | None:
+        return self.data.get(key)
+
+
+def use_fake_put(monkeypatch) -> dict[str, str]:
+    stored: dict[str, str] = {}
+
+    async def put(_redis, key: str, content: str):
+        stored[key] = content
+
+    monkeypatch.setattr(llm_cache, "_put", put)
+    return stored
+
+
+def test_stores_only_the_keyed_models_answer(monkeypatch):
+    stored = use_fake_put(monkeypatch)
+    redis = FakeRedis()
+
+    async def primary():
+        return "from primary", "model-a"
+
+    async def fallback():
+        return "from fallback", "model-b"
+
+    async def main():
+        assert await llm_cache.cached("k1", "model-a", fallback, redis) == "from fallback"
+        assert await llm_cache.cached("k2", "model-a", primary, redis) == "from primary"
+
+    asyncio.run(main())
+    assert stored == {"k2": "from primary"}
+
+
+def test_follower_takes_over_when_leader_is_cancelled(monkeypatch):
+    use_fake_put(monkeypatch)
+    redis = FakeRedis()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05 if calls == 1 else 0)
+        return f"call {calls}", "model-a"
+
+    async def main():
+        leader = asyncio.create_task(llm_cache.cached("k", "model-a", fetch, redis))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(llm_cache.cached("k", "model-a", fetch, redis))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == "call 2"
+    assert calls == 2
@@ -0,0 +1,59 @@
+import pytest
+import structlog
+
+from app.logger import EventRateLimiter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def log(
+    limiter: EventRateLimiter, event: str, method: str = "warning", sampled: bool = True
+) -> dict | None:
+    try:
+        return limiter(None, method, {"event": event, "sampled": sampled})
+    except structlog.DropEvent:
+        return None
+
+
+def test_limits_each_event_per_window():
+    clock = FakeClock()
+    limiter = EventRateLimiter(limit=2, window=10, clock=clock)
+    assert log(limiter, "LLM primary failed")
+    assert log(limiter, "LLM primary failed")
+    assert log(limiter, "LLM primary failed") is None
+    assert log(limiter, "LLM fallback failed")
+
+
+def test_reports_suppressed_count_in_next_window():
+    clock = FakeClock()
+    limiter = EventRateLimiter(limit=1, window=10, clock=clock)
+    log(limiter, "LLM primary failed")
+    for _ in range(3):
+        assert log(limiter, "LLM primary failed") is None
+    clock.now = 10
+    assert log(limiter, "LLM primary failed")["suppressed"] == 3
+
+
+@pytest.mark.parametrize("method", ["error", "critical"])
+def test_errors_are_never_dropped(method):
+    limiter = EventRateLimiter(limit=1, window=10, clock=FakeClock())
+    assert all(log(limiter, "worker failed", method) for _ in range(5))
+
+
+def test_unsampled_events_are_never_dropped():
+    limiter = EventRateLimiter(limit=1, window=10, clock=FakeClock())
+    assert all(log(limiter, "grading failed", sampled=False) for _ in range(5))
+    assert all(log(limiter, f"request len={n}", "info", sampled=False) for n in range(5))
+    assert limiter._events == {}
+
+
+def test_sampled_flag_is_not_rendered():
+    limiter = EventRateLimiter(limit=1, window=10, clock=FakeClock())
+    assert "sampled" not in log(limiter, "LLM cache read failed")
+    assert "sampled" not in log(limiter, "LLM cache read failed", "error")
+    assert "sampled" not in log(EventRateLimiter(limit=0, window=10), "LLM cache read failed")
@@ -1,7 +1,7 @@
 import pytest
 from pydantic import ValidationError
 
-from app.models import Result, Task, WritingScore
+from app.models import Result, SpeakingAnswer, Task, WritingScore
 
 
 def test_task_from_camel_case():
@@ -99,3 +99,35 @@ def test_writing_score_bounds():
 
     assert score.task_fulfillment == 8.5
     assert score.confidence == "medium"
+
+
+def test_speaking_answer_single_part_segments():
+    answer = SpeakingAnswer.model_validate(
+        {"audioUrl": "https://example.com/a.mp3", "partNumber": 2}
+    )
+    [segment] = answer.segments()
+    assert segment.audio_url == "https://example.com/a.mp3"
+    assert segment.part_number == 2
+    assert segment.transcript is None
+
+
+def test_speaking_answer_multi_part():
+    answer = SpeakingAnswer.model_validate(
+        {
+            "parts": [
+                {"audioUrl": "https://example.com/1.mp3", "partNumber": 1},
+                {"transcript": "I think...", "partNumber": 3},
+            ]
+        }
+    )
+    segments = answer.segments()
+    assert [s.part_number for s in segments] == [1, 3]
+    assert segments[1].transcript == "I think..."
+
+
+def test_speaking_answer_requires_source():
+    with pytest.raises(ValidationError):
+        SpeakingAnswer.model_validate({"partNumber": 1})
+
+    with pytest.raises(ValidationError):
+        SpeakingAnswer.model_validate({"parts": [{"partNumber": 1}]})
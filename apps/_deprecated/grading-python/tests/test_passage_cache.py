@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+
+from app.passage_cache import cache_key
+
+
+class Req(BaseModel):
+    text: str
+    skill: str
+    question_numbers: list[int] | None = None
+    answers: dict[str, str] | None = None
+
+
+def test_key_ignores_whitespace_and_ordering():
+    a = Req(text="The  cat\nsat. ", skill="reading", question_numbers=[3, 1], answers={"1": "A", "3": "B"})
+    b = Req(text="The cat sat.", skill="reading", question_numbers=[1, 3], answers={"3": "B", "1": "A"})
+    assert cache_key("explain", "v1", a) == cache_key("explain", "v1", b)
+
+
+def test_key_depends_on_content_kind_and_version():
+    req = Req(text="The cat sat.", skill="reading")
+    key = cache_key("explain", "v1", req)
+    assert key != cache_key("explain", "v1", Req(text="The dog sat.", skill="reading"))
+    assert key != cache_key("explain", "v1", Req(text="The cat sat.", skill="listening"))
+    assert key != cache_key("paraphrase", "v1", req)
+    assert key != cache_key("explain", "v2", req)
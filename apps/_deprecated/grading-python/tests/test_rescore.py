@@ -0,0 +1,23 @@
+from app.rescore import rescore
+
+
+def test_rescores_results_and_passes_failures_through():
+    failed = {"submissionId": "s2", "failed": True}
+    empty = {"submissionId": "s3", "criteriaScores": {}}
+    result = {
+        "submissionId": "s1",
+        "overallScore": 6.0,
+        "band": "B2",
+        "criteriaScores": {"taskFulfillment": 9, "organization": 8.5, "vocabulary": 9, "grammar": 8.5},
+    }
+    records = [dict(failed), dict(empty), result]
+    assert rescore(records) == 1
+    assert records[0] == failed
+    assert records[1] == empty
+    assert result["overallScore"] == 9.0
+    assert result["band"] == "C1"
+
+
+def test_only_failures():
+    records = [{"submissionId": "s1", "failed": True}]
+    assert rescore(records) == 0
@@ -1,4 +1,6 @@
-from app.scoring import snap, to_band
+import numpy as np
+
+from app.scoring import score_batch, snap, snap_all, to_band, to_bands
 
 
 def test_to_band_c1():
@@ -42,3 +44,31 @@ def test_snap_exact():
     assert snap(10) == 10
     assert snap(7.5) == 7.5
     assert snap(7.0) == 7.0
+
+
+def test_to_bands_matches_to_band():
+    scores = [0, 3.9, 4.0, 5.9, 6.0, 8.4, 8.5, 10.0]
+    assert to_bands(np.array(scores)).tolist() == [to_band(s) for s in scores]
+
+
+def test_snap_all_matches_snap():
+    scores = [0, 6.24, 6.25, 6.75, 7.1, 7.3, 7.8, 10]
+    assert snap_all(np.array(scores)).tolist() == [snap(s) for s in scores]
+
+
+def test_score_batch_ignores_padding():
+    criteria = np.array([[7, 6.5, 7, 6], [9, 8.5, np.nan, np.nan]])
+    overall, bands = score_batch(criteria)
+    assert overall.tolist() == [6.5, 9.0]
+    assert bands.tolist() == ["B2", "C1"]
+
+
+def test_to_bands_nan_has_no_band():
+    assert to_bands(np.array([np.nan, 9.0])).tolist() == [None, "C1"]
+
+
+def test_score_batch_empty_row():
+    overall, bands = score_batch(np.array([[np.nan, np.nan], [7, 7]]))
+    assert np.isnan(overall[0])
+    assert overall[1] == 7.0
+    assert bands.tolist() == [None, "B2"]
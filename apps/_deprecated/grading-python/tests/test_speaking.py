@@ -0,0 +1,22 @@
+from app.models import SpeakingPart, SpeakingScore
+from app.speaking import combine
+
+
+def make_score(value: float, confidence: str = "high") -> SpeakingScore:
+    return SpeakingScore(
+        fluency_organization=value,
+        pronunciation=value,
+        grammar=value,
+        vocabulary=value,
+        feedback=f"scored {value}",
+        confidence=confidence,
+    )
+
+
+def test_combine_snaps_averaged_criteria():
+    parts = [SpeakingPart(transcript="a", partNumber=n) for n in (1, 2, 3)]
+    combined = combine(list(zip(parts, [make_score(6), make_score(6.5), make_score(6.5, "low")])))
+    # 19 / 3 = 6.33 would otherwise reach the result off the 0.5 grid.
+    assert combined.grammar == 6.5
+    assert combined.confidence == "low"
+    assert combined.feedback.startswith("Part 1: scored 6")
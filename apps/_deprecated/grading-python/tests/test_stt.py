@@ -0,0 +1,18 @@
+from app.stt import _index_key, unsigned_url
+
+
+def test_unsigned_url_drops_only_signature_params():
+    url = (
+        "https://bucket.s3.amazonaws.com/a/1.webm?versionId=3"
+        "&X-Amz-Algorithm=AWS4-HMAC-SHA256&X-Amz-Signature=abc&X-Amz-Expires=900"
+    )
+    assert unsigned_url(url) == "https://bucket.s3.amazonaws.com/a/1.webm?versionId=3"
+    assert unsigned_url("https://cdn.example.com/a.mp3?Expires=1&Signature=x&Key-Pair-Id=k") == (
+        "https://cdn.example.com/a.mp3"
+    )
+
+
+def test_index_key_keeps_object_identifying_query():
+    base = "https://bucket.s3.amazonaws.com/a/1.webm"
+    assert _index_key(f"{base}?X-Amz-Signature=abc") == _index_key(f"{base}?X-Amz-Signature=def")
+    assert _index_key(f"{base}?versionId=3") != _index_key(f"{base}?versionId=4")
@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import pytest
+
+from app import tracing
+from app.config import settings
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(settings, "trace_file", str(path))
+    return path
+
+
+def read_spans(path) -> dict[str, dict]:
+    tracing.flush()
+    return {s["name"]: s for s in map(json.loads, path.read_text().splitlines())}
+
+
+def test_trace_id_is_stable_per_submission():
+    assert tracing.trace_id_for("sub-1") == tracing.trace_id_for("sub-1")
+    assert tracing.trace_id_for("sub-1") != tracing.trace_id_for("sub-2")
+    assert len(tracing.trace_id_for("sub-1")) == 32
+
+
+def test_child_tasks_share_the_trace(trace_file):
+    async def child(name: str):
+        with tracing.span(name):
+            await asyncio.sleep(0)
+
+    async def main():
+        with tracing.span("grade", trace_id=tracing.trace_id_for("sub-1")):
+            await asyncio.gather(child("a"), asyncio.create_task(child("b")))
+
+    asyncio.run(main())
+    spans = read_spans(trace_file)
+    assert set(spans) == {"grade", "a", "b"}
+    assert {s["traceId"] for s in spans.values()} == {tracing.trace_id_for("sub-1")}
+    assert spans["grade"]["parentSpanId"] is None
+    assert spans["a"]["parentSpanId"] == spans["b"]["parentSpanId"] == spans["grade"]["spanId"]
+    assert tracing.current() is None
+
+
+def test_errors_mark_the_span(trace_file):
+    with pytest.raises(ValueError):
+        with tracing.span("grade"):
+            raise ValueError("boom")
+    span = read_spans(trace_file)["grade"]
+    assert span["status"] == "error"
+    assert "boom" in span["attributes"]["error"]
+
+
+def test_span_ending_after_its_root_is_still_exported(trace_file):
+    async def main():
+        release = asyncio.Event()
+
+        async def straggler():
+            with tracing.span("straggler"):
+                await release.wait()
+
+        with tracing.span("grade"):
+            task = asyncio.create_task(straggler())
+            await asyncio.sleep(0)
+        release.set()
+        await task
+
+    asyncio.run(main())
+    spans = read_spans(trace_file)
+    assert set(spans) == {"grade", "straggler"}
+    assert spans["straggler"]["parentSpanId"] == spans["grade"]["spanId"]
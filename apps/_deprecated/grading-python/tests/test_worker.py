@@ -0,0 +1,244 @@
+import asyncio
+import json
+
+import pytest
+
+from app import worker as worker_module
+from app.config import settings
+from app.models import Result
+from app.worker import DEAD_LETTER, RESULTS_STREAM, TASKS_STREAM, Worker
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_exc):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    async def execute(self):
+        if self.redis.fail_writes:
+            raise ConnectionError("redis went away")
+        self.redis.transactions.append([name for name, _, _ in self.calls])
+        return [await getattr(self.redis, name)(*a, **kw) for name, a, kw in self.calls]
+
+
+class FakeRedis:
+    """Just enough of a Redis Streams consumer group for Worker, with a manual clock (ms)."""
+
+    def __init__(self):
+        self.now_ms = 0
+        self.streams: dict[str, list[tuple[str, dict]]] = {}
+        self.lists: dict[str, list[str]] = {}
+        # message id -> {"consumer", "delivered_at", "times_delivered"}
+        self.pending: dict[str, dict] = {}
+        self.transactions: list[list[str]] = []
+        self.fail_writes = False
+
+    async def xadd(self, name, fields):
+        entries = self.streams.setdefault(name, [])
+        message_id = f"{len(entries) + 1}-0"
+        entries.append((message_id, fields))
+        return message_id
+
+    async def xack(self, _name, _group, message_id):
+        return int(self.pending.pop(message_id, None) is not None)
+
+    async def lpush(self, name, value):
+        self.lists.setdefault(name, []).insert(0, value)
+
+    async def xpending_range(self, _name, _group, min, max, count):
+        entry = self.pending.get(min)
+        return [{"message_id": min, "times_delivered": entry["times_delivered"]}] if entry else []
+
+    async def xautoclaim(self, name, _group, consumer, min_idle_time, start_id, count):
+        claimed = []
+        for message_id, fields in self.streams.get(name, []):
+            entry = self.pending.get(message_id)
+            if entry and self.now_ms - entry["delivered_at"] >= min_idle_time and len(claimed) < count:
+                entry.update(consumer=consumer, delivered_at=self.now_ms)
+                entry["times_delivered"] += 1
+                claimed.append((message_id, fields))
+        return ["0-0", claimed, []]
+
+    async def xclaim(self, _name, _group, consumer, min_idle_time, message_ids, justid=False):
+        for message_id in message_ids:
+            if message_id in self.pending:
+                self.pending[message_id].update(consumer=consumer, delivered_at=self.now_ms)
+        return message_ids
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def deliver(self, payload: str, consumer: str = "c1", times_delivered: int = 1):
+        fields = {"payload": payload}
+        message_id = await self.xadd(TASKS_STREAM, fields)
+        self.pending[message_id] = {
+            "consumer": consumer,
+            "delivered_at": self.now_ms,
+            "times_delivered": times_delivered,
+        }
+        return message_id, fields
+
+    def results(self) -> list[dict]:
+        return [json.loads(fields["payload"]) for _, fields in self.streams.get(RESULTS_STREAM, [])]
+
+
+TASK = json.dumps(
+    {
+        "submissionId": "sub-1",
+        "questionId": "q-1",
+        "skill": "writing",
+        "answer": {"text": "Dear Sir,", "taskType": "letter"},
+        "dispatchedAt": "2025-01-01T00:00:00Z",
+    }
+)
+
+
+def make_result() -> Result:
+    return Result(overallScore=7.0, criteriaScores={"grammar": 7.0}, feedback="ok", confidence="high")
+
+
+@pytest.fixture
+def grade(monkeypatch):
+    """Replace worker.grade with one returning (or raising) the given outcome."""
+
+    def install(outcome):
+        async def fake(task, redis):
+            if isinstance(outcome, asyncio.Event):
+                await outcome.wait()
+                return make_result()
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        monkeypatch.setattr(worker_module, "grade", fake)
+
+    return install
+
+
+async def handle(worker: Worker, message_id: str, fields: dict):
+    await worker.slots.acquire()  # _handle releases the slot it was started with
+    await worker._handle(message_id, fields)
+
+
+def test_acks_in_the_same_transaction_as_the_result(grade):
+    grade(make_result())
+    redis = FakeRedis()
+
+    async def main():
+        message_id, fields = await redis.deliver(TASK)
+        await handle(Worker(redis, "c1", 1), message_id, fields)
+        return message_id
+
+    message_id = asyncio.run(main())
+    assert redis.transactions == [["xadd", "xack"]]
+    assert redis.results()[0]["submissionId"] == "sub-1"
+    assert message_id not in redis.pending
+
+
+def test_not_acked_when_the_result_cannot_be_written(grade):
+    grade(make_result())
+    redis = FakeRedis()
+    redis.fail_writes = True
+
+    async def main():
+        message_id, fields = await redis.deliver(TASK)
+        await handle(Worker(redis, "c1", 1), message_id, fields)
+        return message_id
+
+    message_id = asyncio.run(main())
+    assert message_id in redis.pending
+    assert redis.results() == []
+
+
+def test_transient_failure_stays_pending(grade):
+    grade(RuntimeError("LLM timeout"))
+    redis = FakeRedis()
+
+    async def main():
+        message_id, fields = await redis.deliver(TASK)
+        await handle(Worker(redis, "c1", 1), message_id, fields)
+        return message_id
+
+    message_id = asyncio.run(main())
+    assert message_id in redis.pending
+    assert redis.results() == []
+    assert DEAD_LETTER not in redis.lists
+
+
+def test_dead_letters_after_max_deliveries(grade):
+    grade(RuntimeError("LLM timeout"))
+    redis = FakeRedis()
+
+    async def main():
+        message_id, fields = await redis.deliver(TASK, times_delivered=settings.worker_max_deliveries)
+        await handle(Worker(redis, "c1", 1), message_id, fields)
+        return message_id
+
+    message_id = asyncio.run(main())
+    assert message_id not in redis.pending
+    assert redis.results() == [{"submissionId": "sub-1", "failed": True}]
+    assert json.loads(redis.lists[DEAD_LETTER][0])["error"] == "LLM timeout"
+
+
+def test_invalid_payload_still_reports_its_submission(grade):
+    grade(make_result())
+    redis = FakeRedis()
+
+    async def main():
+        for payload in (json.dumps({"submissionId": "sub-2", "skill": "writing"}), "not json"):
+            message_id, fields = await redis.deliver(payload)
+            await handle(Worker(redis, "c1", 1), message_id, fields)
+
+    asyncio.run(main())
+    assert redis.results() == [{"submissionId": "sub-2", "failed": True}]
+    assert len(redis.lists[DEAD_LETTER]) == 2
+    assert redis.pending == {}
+
+
+def test_heartbeat_keeps_a_long_grade_from_being_reclaimed(grade, monkeypatch):
+    monkeypatch.setattr(worker_module, "HEARTBEAT_INTERVAL", 0.01)
+    finish = asyncio.Event()
+    grade(finish)
+    redis = FakeRedis()
+
+    async def main():
+        message_id, fields = await redis.deliver(TASK)
+        owner = Worker(redis, "c1", 1)
+        owner._heartbeat_task = asyncio.create_task(owner._heartbeat())
+        job = asyncio.create_task(handle(owner, message_id, fields))
+        await asyncio.sleep(0)
+
+        # The grade outlasts the claim idle time; the heartbeat re-claims it meanwhile.
+        redis.now_ms += settings.worker_claim_idle_ms + 1
+        await asyncio.sleep(0.05)
+        stolen = await Worker(redis, "c2", 1)._claim(1)
+
+        finish.set()
+        await job
+        await owner.stop()
+        return stolen
+
+    assert asyncio.run(main()) == []
+    assert len(redis.results()) == 1
+
+
+def test_idle_message_without_heartbeat_is_reclaimed():
+    redis = FakeRedis()
+
+    async def main():
+        message_id, _ = await redis.deliver(TASK)
+        redis.now_ms += settings.worker_claim_idle_ms + 1
+        return message_id, await Worker(redis, "c2", 1)._claim(1)
+
+    message_id, claimed = asyncio.run(main())
+    assert [m for m, _ in claimed] == [message_id]
+    assert redis.pending[message_id]["consumer"] == "c2"
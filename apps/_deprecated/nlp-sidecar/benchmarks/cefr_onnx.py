@@ -0,0 +1,93 @@
+"""Parity, latency and memory of the CEFR classifier: PyTorch vs. ONNX exports.
+
+For every backend available (PyTorch, model.onnx, model_quantized.onnx) this
+classifies the same texts, reports agreement of the predicted level with
+PyTorch and the largest probability difference, per-text latency at batch
+sizes 1 and CEFR_MAX_BATCH, and resident memory added by loading the model.
+Backends load one after another in this process, so later memory figures are
+approximate; pass --backend to measure one in isolation.
+
+    python -m benchmarks.cefr_onnx [--texts essays.txt]
+"""
+
+import argparse
+import gc
+import os
+import statistics
+import time
+
+import numpy as np
+
+import main
+
+SAMPLES = [
+    "I like my family. My mother is a teacher and my father is a doctor.",
+    "Last summer I went to the beach with my friends and we had a lot of fun swimming.",
+    "Although technology has made communication easier, it has also reduced the quality of face-to-face interaction.",
+    "In my opinion, governments should invest more in public transport because it reduces pollution and traffic jams in big cities.",
+    "The proliferation of remote work has fundamentally reshaped urban economies, prompting a reevaluation of commercial real estate and municipal tax bases.",
+]
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def load(backend: str) -> float:
+    """Load one backend into main's globals; returns MB of RSS it added."""
+    main.cefr_model = main.cefr_session = None
+    gc.collect()
+    before = rss_mb()
+    main.CEFR_ONNX = "" if backend == "torch" else backend
+    if not main.load_cefr() or (backend != "torch" and main.cefr_session is None):
+        raise FileNotFoundError(backend)
+    return rss_mb() - before
+
+
+def latency_ms(texts: list[str], batch_size: int, rounds: int = 3) -> float:
+    times = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for i in range(0, len(texts), batch_size):
+            main.cefr_batch(texts[i : i + batch_size])
+        times.append((time.perf_counter() - t0) * 1000 / len(texts))
+    return statistics.median(times)
+
+
+BACKENDS = ("torch", "model.onnx", "model_quantized.onnx")
+
+
+def run(texts: list[str], backends=BACKENDS):
+    baseline = None
+    for backend in backends:
+        try:
+            memory = load(backend)
+        except FileNotFoundError:
+            print(f"{backend:22} not available, skipping")
+            continue
+        probs = np.stack(main.cefr_batch(texts))
+        if baseline is None:
+            # Parity is against the first backend run (PyTorch by default).
+            baseline = probs
+        agree = np.mean(probs.argmax(-1) == baseline.argmax(-1))
+        diff = np.abs(probs - baseline).max()
+        single = latency_ms(texts, 1)
+        batched = latency_ms(texts, main.CEFR_MAX_BATCH)
+        print(
+            f"{backend:22} agree {agree:6.1%}   max |dp| {diff:.4f}   "
+            f"{single:7.1f} ms/text (b=1)   {batched:7.1f} ms/text (b={main.CEFR_MAX_BATCH})   "
+            f"+{memory:6.0f} MB RSS"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--texts", help="file with one text per line (default: built-in samples)")
+    parser.add_argument("--backend", choices=BACKENDS, action="append")
+    args = parser.parse_args()
+    texts = SAMPLES
+    if args.texts:
+        with open(args.texts) as f:
+            texts = [line.strip() for line in f if line.strip()]
+    run(texts, args.backend or BACKENDS)
@@ -0,0 +1,78 @@
+"""Throughput vs. latency of /grammar/check inference with and without batching.
+
+Drives the GECToR batcher in-process at several concurrency levels, once with
+batches of 1 (the old one-run-per-request behaviour) and once with the
+configured GECTOR_MAX_BATCH / GECTOR_MAX_WAIT_MS. Needs the model in MODELS_DIR.
+
+    python -m benchmarks.grammar_batching [--requests 256]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import main
+from batcher import MicroBatcher
+
+SENTENCES = [
+    "She go to school every day and she like it very much.",
+    "I has been living in this city since three years.",
+    "The informations you gave me was very useful for my study.",
+    "Yesterday we have visited the museum, it was really interested.",
+    "If I would have more time, I will learn to play the piano.",
+    "People in my country doesn't usually eats breakfast outside.",
+]
+
+
+async def drive(batcher: MicroBatcher, concurrency: int, total: int) -> tuple[float, list[float]]:
+    latencies: list[float] = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with sem:
+            text = " ".join(SENTENCES[(i + k) % len(SENTENCES)] for k in range(1 + i % 3))
+            t0 = time.perf_counter()
+            await batcher.submit(text)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return total / (time.perf_counter() - t0), latencies
+
+
+async def run(total: int, levels: list[int]):
+    configs = {
+        "batch=1": (1, 0),
+        f"batch<={main.GECTOR_MAX_BATCH}, wait {main.GECTOR_MAX_WAIT_MS:g}ms": (
+            main.GECTOR_MAX_BATCH,
+            main.GECTOR_MAX_WAIT_MS,
+        ),
+    }
+    main.gector_batch([SENTENCES[0]])  # warm up
+    for name, (max_batch, max_wait_ms) in configs.items():
+        for concurrency in levels:
+            batcher = MicroBatcher(main.gector_batch, max_batch, max_wait_ms)
+            rps, latencies = await drive(batcher, concurrency, total)
+            p50 = statistics.median(latencies)
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            print(
+                f"{name:24} c={concurrency:<3} {rps:7.1f} req/s   "
+                f"p50 {p50:7.1f} ms   p95 {p95:7.1f} ms   "
+                f"avg batch {batcher.stats()['avg_batch_size']}"
+            )
+            await batcher.close()
+
+
+def cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+    if not main.load_gector():
+        raise SystemExit("GECToR model not available")
+    asyncio.run(run(args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,56 @@
+"""Export the CEFR classifier to ONNX for main.load_cefr.
+
+Writes cefr-classifier/onnx/model.onnx (fp32) and, with --quantize, the
+dynamically int8-quantized model_quantized.onnx that the sidecar loads by
+default. Check parity before shipping with benchmarks/cefr_onnx.py.
+
+    python export_cefr_onnx.py --quantize
+"""
+
+import argparse
+import os
+
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+from main import CEFR_MODEL_DIR
+
+
+def export(model_dir: str, quantize: bool):
+    out_dir = os.path.join(model_dir, "onnx")
+    os.makedirs(out_dir, exist_ok=True)
+    fp32_path = os.path.join(out_dir, "model.onnx")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    model.eval()
+
+    sample = tokenizer("An example sentence.", return_tensors="pt")
+    names = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in sample]
+    dynamic = {"batch": 0, "sequence": 1}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[k] for k in names),
+            fp32_path,
+            input_names=names,
+            output_names=["logits"],
+            dynamic_axes={**{k: dynamic for k in names}, "logits": {0: "batch"}},
+            opset_version=17,
+        )
+    print(f"Exported {fp32_path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        int8_path = os.path.join(out_dir, "model_quantized.onnx")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"Quantized {int8_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-dir", default=CEFR_MODEL_DIR)
+    parser.add_argument("--quantize", action="store_true", help="also write an int8 model")
+    args = parser.parse_args()
+    export(args.model_dir, args.quantize)
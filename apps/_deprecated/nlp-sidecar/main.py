@@ -2,51 +2,92 @@
 NLP Sidecar — GECToR + CEFR Classifier.
 
 Endpoints:
-  POST /grammar/check   — token-level grammar error detection
+  POST /grammar/check   — token-level grammar error detection (any length)
+  POST /grammar/correct — iterative GECToR correction
   POST /cefr/predict    — CEFR level classification
   GET  /health          — readiness
 """
 
+import asyncio
+import bisect
+import itertools
 import os
+import re
+import string
 import time
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from typing import Optional
 
 import numpy as np
 import torch
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from batcher import MicroBatcher
 
 # Paths — Docker build downloads to /app/models, local dev to /tmp/hf_models
 MODELS_DIR = os.environ.get("MODELS_DIR", "/app/models")
 CEFR_MODEL_DIR = os.path.join(MODELS_DIR, "cefr-classifier")
 GECTOR_MODEL_DIR = os.path.join(MODELS_DIR, "gector-large-2024")
 
+# CEFR runs on ONNX Runtime when this export exists (see export_cefr_onnx.py),
+# else on PyTorch. Set CEFR_ONNX= (empty) to force PyTorch.
+CEFR_ONNX = os.environ.get("CEFR_ONNX", "model_quantized.onnx")
+CEFR_MAX_BATCH = int(os.environ.get("CEFR_MAX_BATCH", "8"))
+CEFR_MAX_WAIT_MS = float(os.environ.get("CEFR_MAX_WAIT_MS", "10"))
+CEFR_MAX_LENGTH = 512
+
+# Dynamic batching — concurrent requests share one ONNX run
+GECTOR_MAX_BATCH = int(os.environ.get("GECTOR_MAX_BATCH", "16"))
+GECTOR_MAX_WAIT_MS = float(os.environ.get("GECTOR_MAX_WAIT_MS", "5"))
+GECTOR_MAX_LENGTH = 128
+GECTOR_MAX_ITERATIONS = int(os.environ.get("GECTOR_MAX_ITERATIONS", "5"))
+# Batches are padded up to one of these lengths, so the runtime sees a few
+# stable shapes instead of a new one per batch.
+SEQ_BUCKETS = (16, 32, 64, 128, 256, 512)
+# Sentence-final punctuation (plus closing quotes/brackets) before whitespace
+SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*(?=\s|$)")
+
 # Global model holders
 cefr_model = None
+cefr_session = None
 cefr_tokenizer = None
+cefr_labels = None
 gector_session = None
 gector_tokenizer = None
 gector_labels = None
+gector_verb_forms: dict[tuple[str, str], str] = {}  # (word, "VB_VBZ") -> form
 
 
 def load_cefr():
-    global cefr_model, cefr_tokenizer
-    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    global cefr_model, cefr_session, cefr_tokenizer, cefr_labels
+    from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer
 
     if not os.path.exists(os.path.join(CEFR_MODEL_DIR, "config.json")):
         print(f"CEFR model not found at {CEFR_MODEL_DIR}, skipping.")
         return False
 
     cefr_tokenizer = AutoTokenizer.from_pretrained(CEFR_MODEL_DIR)
+    config = AutoConfig.from_pretrained(CEFR_MODEL_DIR)
+    cefr_labels = [config.id2label[i] for i in range(config.num_labels)]
+
+    onnx_path = os.path.join(CEFR_MODEL_DIR, "onnx", CEFR_ONNX) if CEFR_ONNX else ""
+    if onnx_path and os.path.exists(onnx_path):
+        import onnxruntime as ort
+
+        cefr_session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+        print(f"CEFR model loaded: {CEFR_ONNX}, ONNX CPU")
+        return True
+
     cefr_model = AutoModelForSequenceClassification.from_pretrained(CEFR_MODEL_DIR)
     cefr_model.eval()
-    print(f"CEFR model loaded: {sum(p.numel() for p in cefr_model.parameters())/1e6:.0f}M params")
+    print(f"CEFR model loaded: {sum(p.numel() for p in cefr_model.parameters())/1e6:.0f}M params, PyTorch")
     return True
 
 
 def load_gector():
-    global gector_session, gector_tokenizer, gector_labels
+    global gector_session, gector_tokenizer, gector_labels, gector_verb_forms
     import onnxruntime as ort
     from transformers import AutoTokenizer
 
@@ -63,6 +104,16 @@ def load_gector():
     with open(labels_path) as f:
         gector_labels = [line.strip() for line in f.readlines()]
 
+    # Needed by $TRANSFORM_VERB_* edits in /grammar/correct; lines look like
+    # "go_goes:VB_VBZ". Without it those edits are skipped.
+    verbs_path = os.path.join(GECTOR_MODEL_DIR, "verb-form-vocab.txt")
+    if os.path.exists(verbs_path):
+        with open(verbs_path) as f:
+            for line in f:
+                forms, tags = line.strip().split(":")
+                source, target = forms.split("_")
+                gector_verb_forms[(source, tags)] = target
+
     print(f"GECToR loaded: {len(gector_labels)} labels, ONNX CPU")
     return True
 
@@ -75,6 +126,8 @@ async def lifespan(app: FastAPI):
     gector_ok = load_gector()
     print(f"Models loaded in {time.time()-t0:.1f}s (CEFR={cefr_ok}, GECToR={gector_ok})")
     yield
+    await gector_batcher.close()
+    await cefr_batcher.close()
 
 
 app = FastAPI(title="VSTEP NLP Sidecar", lifespan=lifespan)
@@ -89,11 +142,18 @@ class TextInput(BaseModel):
 
 
 class GrammarError(BaseModel):
-    token: str
-    position: int
+    token: str  # the word as written in the text
+    position: int  # subword index (counting <s>) of the predicting token
+    offset: int  # character span of the word in the input text
+    length: int
     tag: str
     correction: Optional[str] = None
     error_type: Optional[str] = None
+    # Same shape as the grading service's GrammarError: a readable message and
+    # the text to put in place of [offset, offset + length), if the edit
+    # rewrites the word itself ("" deletes it).
+    message: str
+    suggestion: Optional[str] = None
 
 
 class GrammarResponse(BaseModel):
@@ -101,6 +161,29 @@ class GrammarResponse(BaseModel):
     inference_ms: float
 
 
+class CorrectionInput(TextInput):
+    # Added to P($KEEP) before choosing a label; higher means fewer edits.
+    confidence: float = 0.0
+    # Skip sentences whose highest token error probability (1 - P($KEEP)) is below this.
+    min_error_probability: float = Field(0.0, ge=0, le=1)
+    # Skip individual edits whose label probability is below this.
+    min_probability: float = Field(0.0, ge=0, le=1)
+    max_iterations: int = Field(GECTOR_MAX_ITERATIONS, ge=1, le=10)
+
+
+class CorrectionIteration(BaseModel):
+    iteration: int
+    sentences: int  # re-inferred this pass (only those changed by the last)
+    edits: int
+    inference_ms: float
+
+
+class CorrectionResponse(BaseModel):
+    corrected: str
+    iterations: list[CorrectionIteration]
+    inference_ms: float
+
+
 class CefrResponse(BaseModel):
     predicted_level: str
     confidence: float
@@ -115,98 +198,424 @@ class CefrResponse(BaseModel):
 def health():
     return {
         "status": "ok",
-        "cefr_loaded": cefr_model is not None,
+        "cefr_loaded": cefr_model is not None or cefr_session is not None,
+        "cefr_backend": "onnx" if cefr_session is not None else "torch",
+        "cefr_batching": cefr_batcher.stats(),
         "gector_loaded": gector_session is not None,
+        "gector_batching": gector_batcher.stats(),
     }
 
 
 @app.post("/grammar/check", response_model=GrammarResponse)
-def grammar_check(input: TextInput):
+async def grammar_check(input: TextInput):
     if gector_session is None:
         raise HTTPException(503, "GECToR model not loaded")
 
     t0 = time.time()
+    errors = await gector_batcher.submit(input.text)
 
-    # Tokenize
-    inputs = gector_tokenizer(
-        input.text,
-        return_tensors="np",
-        padding=True,
-        truncation=True,
-        max_length=128,
+    return GrammarResponse(
+        errors=errors,
+        inference_ms=(time.time() - t0) * 1000,
     )
 
-    # Filter to only inputs the model expects
-    input_names = [i.name for i in gector_session.get_inputs()]
-    feed = {k: v for k, v in inputs.items() if k in input_names}
-
-    # Inference
-    outputs = gector_session.run(None, feed)
-    logits = outputs[0]  # (1, seq_len, num_labels)
-    predictions = np.argmax(logits, axis=-1)[0]
 
-    # Parse errors
-    tokens = gector_tokenizer.convert_ids_to_tokens(inputs["input_ids"][0])
-    errors = []
-    for i, (token, pred_id) in enumerate(zip(tokens, predictions)):
-        if token in ["<s>", "</s>", "<pad>", "<mask>"]:
-            continue
-        if pred_id >= len(gector_labels):
-            continue
-        label = gector_labels[pred_id]
-        if label == "$KEEP":
-            continue
+@app.post("/grammar/correct", response_model=CorrectionResponse)
+async def grammar_correct(input: CorrectionInput):
+    if gector_session is None:
+        raise HTTPException(503, "GECToR model not loaded")
 
-        error_type, correction = parse_gector_label(label)
-        errors.append(GrammarError(
-            token=token,
-            position=i,
-            tag=label,
-            correction=correction,
-            error_type=error_type,
-        ))
+    t0 = time.time()
+    corrected, iterations = await asyncio.to_thread(
+        gector_correct,
+        input.text,
+        input.confidence,
+        input.min_error_probability,
+        input.min_probability,
+        input.max_iterations,
+    )
 
-    return GrammarResponse(
-        errors=errors,
+    return CorrectionResponse(
+        corrected=corrected,
+        iterations=iterations,
         inference_ms=(time.time() - t0) * 1000,
     )
 
 
 @app.post("/cefr/predict", response_model=CefrResponse)
-def cefr_predict(input: TextInput):
-    if cefr_model is None:
+async def cefr_predict(input: TextInput):
+    if cefr_model is None and cefr_session is None:
         raise HTTPException(503, "CEFR model not loaded")
 
     t0 = time.time()
+    probs = await cefr_batcher.submit(input.text)
 
-    inputs = cefr_tokenizer(
-        input.text,
-        return_tensors="pt",
-        truncation=True,
-        max_length=512,
-    )
-
-    with torch.no_grad():
-        outputs = cefr_model(**inputs)
-
-    probs = torch.softmax(outputs.logits, dim=-1)[0]
-    pred_id = probs.argmax().item()
-    pred_label = cefr_model.config.id2label[pred_id]
-    confidence = probs[pred_id].item()
-
+    pred_id = int(probs.argmax())
     all_levels = {
-        cefr_model.config.id2label[i]: round(probs[i].item(), 4)
+        cefr_labels[i]: round(float(probs[i]), 4)
         for i in range(len(probs))
     }
 
     return CefrResponse(
-        predicted_level=pred_label,
-        confidence=round(confidence, 4),
+        predicted_level=cefr_labels[pred_id],
+        confidence=round(float(probs[pred_id]), 4),
         all_levels=all_levels,
         inference_ms=(time.time() - t0) * 1000,
     )
 
 
+# ─── Batched inference ─────────────────────────────────────────────────────────
+
+
+def bucket_length(length: int) -> int:
+    """Smallest sequence bucket that fits length."""
+    for bucket in SEQ_BUCKETS:
+        if length <= bucket:
+            return bucket
+    return SEQ_BUCKETS[-1]
+
+
+def pad_to_bucket(tokenizer, encoded, return_tensors: str = "np"):
+    """Pad a tokenized batch to the bucket fitting its longest sequence."""
+    longest = max(len(ids) for ids in encoded["input_ids"])
+    return tokenizer.pad(
+        encoded,
+        padding="max_length",
+        max_length=bucket_length(longest),
+        return_tensors=return_tensors,
+    )
+
+
+def run_onnx(session, inputs) -> np.ndarray:
+    """First output of session, fed only the inputs it declares."""
+    input_names = [i.name for i in session.get_inputs()]
+    feed = {k: v for k, v in inputs.items() if k in input_names}
+    return session.run(None, feed)[0]
+
+
+def sentence_ends(text: str, offsets: list[tuple[int, int]]) -> list[int]:
+    """Token indices just past each sentence end (sorted)."""
+    ends = {m.end() for m in SENTENCE_END.finditer(text)}
+    return [i + 1 for i, (_, end) in enumerate(offsets) if end in ends]
+
+
+def gector_windows(n_tokens: int, boundaries: list[int], budget: int) -> list[tuple[int, int, int]]:
+    """Cover n_tokens with (start, own_start, end) windows of at most budget tokens.
+
+    Windows end at a sentence boundary where one fits, and start one sentence
+    early so the model sees the preceding sentence as context; a window only
+    reports tokens in [own_start, end), so every token is reported once.
+    """
+    windows = []
+    start = own = 0
+    while own < n_tokens:
+        limit = min(start + budget, n_tokens)
+        end = limit
+        if limit < n_tokens:
+            i = bisect.bisect_right(boundaries, limit) - 1
+            if i >= 0 and boundaries[i] > own:
+                end = boundaries[i]
+        windows.append((start, own, end))
+        # Next window starts at the last sentence of this one, unless that
+        # overlap would eat half the budget.
+        i = bisect.bisect_left(boundaries, end) - 1
+        start = boundaries[i] if i >= 0 and end - boundaries[i] < budget // 2 else end
+        own = end
+    return windows
+
+
+@dataclass
+class TokenPredictions:
+    """GECToR output for one text, per (special-token-free) text token."""
+
+    offsets: list[tuple[int, int]]
+    word_ids: list[int | None]
+    label_ids: np.ndarray
+    label_probs: np.ndarray  # probability of the chosen label
+    error_probs: np.ndarray  # 1 - P($KEEP), before any keep bias
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    probs = np.exp(logits)
+    return probs / probs.sum(axis=-1, keepdims=True)
+
+
+def gector_predict(texts: list[str], keep_bias: float = 0.0) -> list[TokenPredictions]:
+    """Run GECToR over a batch of texts of any length.
+
+    Texts longer than the model's 128 tokens are split into overlapping
+    windows (see gector_windows) and every window of every text goes into the
+    same batched runs, so cost grows linearly with length. keep_bias is added
+    to P($KEEP) before choosing a label, GECToR's "additional confidence".
+    """
+    budget = GECTOR_MAX_LENGTH - gector_tokenizer.num_special_tokens_to_add()
+    encoded = gector_tokenizer(texts, add_special_tokens=False, return_offsets_mapping=True)
+    keep_id = gector_labels.index("$KEEP")
+
+    rows = []  # (text index, window)
+    results = []
+    for t, (text, offsets) in enumerate(zip(texts, encoded["offset_mapping"])):
+        for window in gector_windows(len(offsets), sentence_ends(text, offsets), budget):
+            rows.append((t, window))
+        n = len(offsets)
+        results.append(TokenPredictions(
+            offsets=offsets,
+            word_ids=encoded.word_ids(t),
+            label_ids=np.full(n, keep_id, dtype=np.int64),
+            label_probs=np.ones(n),
+            error_probs=np.zeros(n),
+        ))
+
+    for b in range(0, len(rows), GECTOR_MAX_BATCH):
+        chunk = rows[b : b + GECTOR_MAX_BATCH]
+        input_ids = [
+            gector_tokenizer.build_inputs_with_special_tokens(
+                encoded["input_ids"][t][start:end]
+            )
+            for t, (start, _, end) in chunk
+        ]
+        inputs = pad_to_bucket(
+            gector_tokenizer,
+            {"input_ids": input_ids, "attention_mask": [[1] * len(ids) for ids in input_ids]},
+        )
+
+        # Inference
+        probs = softmax(run_onnx(gector_session, inputs))  # (rows, seq_len, labels)
+        error_probs = 1 - probs[..., keep_id]
+        if keep_bias:
+            probs[..., keep_id] += keep_bias
+        predictions = np.argmax(probs, axis=-1)
+        chosen = np.take_along_axis(probs, predictions[..., None], axis=-1)[..., 0]
+
+        for r, (t, (start, own, end)) in enumerate(chunk):
+            # Row token 1 is text token `start` (token 0 is <s>).
+            cols = slice(1 + own - start, 1 + end - start)
+            results[t].label_ids[own:end] = predictions[r, cols]
+            results[t].label_probs[own:end] = chosen[r, cols]
+            results[t].error_probs[own:end] = error_probs[r, cols]
+    return results
+
+
+def gector_batch(texts: list[str]) -> list[list[GrammarError]]:
+    """/grammar/check for a batch of texts; one error list per text."""
+    return [word_errors(text, pred) for text, pred in zip(texts, gector_predict(texts))]
+
+
+def words(pred: TokenPredictions) -> list[tuple[int, int, list[int]]]:
+    """(start, end, token indices) of each word, from the tokenizer's word_ids.
+
+    Character spans come from offset_mapping, so they index the original
+    text directly.
+    """
+    spans = []
+    for _, group in itertools.groupby(range(len(pred.offsets)), key=lambda i: pred.word_ids[i]):
+        indices = list(group)
+        spans.append((pred.offsets[indices[0]][0], pred.offsets[indices[-1]][1], indices))
+    return spans
+
+
+def word_labels(pred: TokenPredictions, min_probability: float = 0.0):
+    """Yield (start, end, label, token index) for each word with a non-$KEEP label.
+
+    The first labelled subword of a word wins.
+    """
+    for start, end, indices in words(pred):
+        labelled = [
+            i for i in indices
+            if pred.label_ids[i] < len(gector_labels)
+            and gector_labels[pred.label_ids[i]] != "$KEEP"
+            and pred.label_probs[i] >= min_probability
+        ]
+        if labelled:
+            yield start, end, gector_labels[pred.label_ids[labelled[0]]], labelled[0]
+
+
+def word_errors(text: str, pred: TokenPredictions) -> list[GrammarError]:
+    """One error per word whose subwords carry a non-$KEEP label."""
+    errors = []
+    for start, end, label, index in word_labels(pred):
+        error_type, correction = parse_gector_label(label)
+        token = text[start:end]
+        suggestion = edited_word(token, label)
+        errors.append(GrammarError(
+            token=token,
+            position=index + 1,
+            offset=start,
+            length=end - start,
+            tag=label,
+            correction=correction,
+            error_type=error_type,
+            message=error_message(token, label, error_type, suggestion),
+            suggestion=suggestion,
+        ))
+    return errors
+
+
+def edited_word(word: str, label: str) -> Optional[str]:
+    """The word after applying its label, or None if the label doesn't rewrite it.
+
+    $MERGE_ edits change the gap after the word, not the word, so they have
+    no replacement text.
+    """
+    if label == "$DELETE":
+        return ""
+    if label.startswith("$REPLACE_"):
+        return label[len("$REPLACE_"):]
+    if label.startswith("$APPEND_"):
+        extra = label[len("$APPEND_"):]
+        space = "" if all(c in string.punctuation for c in extra) else " "
+        return word + space + extra
+    if label.startswith("$TRANSFORM_"):
+        new = transform_word(word, label[len("$TRANSFORM_"):])
+        return None if new == word else new
+    return None
+
+
+def error_message(token: str, label: str, error_type: Optional[str], suggestion: Optional[str]) -> str:
+    """Human-readable description of a word's GECToR edit."""
+    if label == "$DELETE":
+        return f'Remove "{token}"'
+    if label.startswith("$APPEND_"):
+        return f'Add "{label[len("$APPEND_"):]}" after "{token}"'
+    if label == "$MERGE_HYPHEN":
+        return f'Join "{token}" and the next word with a hyphen'
+    if label.startswith("$MERGE_"):
+        return f'Join "{token}" with the next word'
+    if suggestion is not None:
+        return f'Change "{token}" to "{suggestion}"'
+    return f'Possible {error_type} error: "{token}"'
+
+
+def cefr_batch(texts: list[str]) -> list[np.ndarray]:
+    """Class probabilities for each text, from ONNX Runtime or PyTorch."""
+    encoded = cefr_tokenizer(texts, truncation=True, max_length=CEFR_MAX_LENGTH)
+    if cefr_session is not None:
+        logits = run_onnx(cefr_session, pad_to_bucket(cefr_tokenizer, encoded))
+    else:
+        with torch.no_grad():
+            logits = cefr_model(**pad_to_bucket(cefr_tokenizer, encoded, "pt")).logits.numpy()
+    return list(softmax(logits))
+
+
+gector_batcher = MicroBatcher(gector_batch, GECTOR_MAX_BATCH, GECTOR_MAX_WAIT_MS)
+cefr_batcher = MicroBatcher(cefr_batch, CEFR_MAX_BATCH, CEFR_MAX_WAIT_MS)
+
+
+# ─── Correction ────────────────────────────────────────────────────────────────
+
+
+def split_sentences(text: str) -> list[str]:
+    """Pieces that concatenate back to text, one sentence (with its leading space) each."""
+    pieces = []
+    start = 0
+    for m in SENTENCE_END.finditer(text):
+        pieces.append(text[start:m.end()])
+        start = m.end()
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+def transform_word(word: str, op: str) -> Optional[str]:
+    """Apply a $TRANSFORM_ operation, or None if it can't be applied."""
+    if op == "CASE_LOWER":
+        return word.lower()
+    if op == "CASE_UPPER":
+        return word.upper()
+    if op == "CASE_CAPITAL":
+        return word.capitalize()
+    if op == "CASE_CAPITAL_1":
+        return word[0] + word[1:].capitalize() if len(word) > 1 else None
+    if op == "CASE_UPPER_-1":
+        return word[:-1].upper() + word[-1]
+    if op == "AGREEMENT_SINGULAR":
+        return word[:-1] if word.endswith("s") else None
+    if op == "AGREEMENT_PLURAL":
+        return word + "s"
+    if op == "SPLIT_HYPHEN":
+        return word.replace("-", " ")
+    if op.startswith("VERB_"):
+        return gector_verb_forms.get((word, op[len("VERB_"):]))
+    return None
+
+
+def apply_edits(sentence: str, pred: TokenPredictions, min_probability: float) -> tuple[str, int]:
+    """Apply one pass of GECToR edits to a sentence; returns (new sentence, edits)."""
+    labels = {start: label for start, _, label, _ in word_labels(pred, min_probability)}
+    if not labels:
+        return sentence, 0
+
+    # [text before the word, word] per word; edits rewrite these in place.
+    items = []
+    pos = 0
+    for start, end, _ in words(pred):
+        items.append([sentence[pos:start], sentence[start:end], labels.get(start)])
+        pos = end
+    tail = sentence[pos:]
+
+    edits = 0
+    for i, (_, word, label) in enumerate(items):
+        if label is None:
+            continue
+        following = items[i + 1] if i + 1 < len(items) else None
+        if label == "$DELETE":
+            if i == 0 and following is not None:
+                following[0] = items[0][0]
+            items[i][0] = items[i][1] = ""
+        elif label.startswith("$MERGE_") and following is not None:
+            following[0] = "-" if label == "$MERGE_HYPHEN" else ""
+        else:
+            new = edited_word(word, label)
+            if new is None:
+                continue
+            items[i][1] = new
+        edits += 1
+
+    return "".join(gap + word for gap, word, _ in items) + tail, edits
+
+
+def gector_correct(
+    text: str,
+    confidence: float = 0.0,
+    min_error_probability: float = 0.0,
+    min_probability: float = 0.0,
+    max_iterations: int = GECTOR_MAX_ITERATIONS,
+) -> tuple[str, list[CorrectionIteration]]:
+    """Apply GECToR edits and re-run until nothing changes (or max_iterations).
+
+    Each pass only re-infers sentences the previous pass changed, batched. As
+    in GECToR, min_error_probability gates whole sentences on their most
+    likely error and min_probability gates each edit on its label probability.
+    """
+    sentences = split_sentences(text)
+    active = [i for i, sentence in enumerate(sentences) if sentence.strip()]
+    iterations = []
+    for n in range(1, max_iterations + 1):
+        if not active:
+            break
+        t0 = time.time()
+        preds = gector_predict([sentences[i] for i in active], keep_bias=confidence)
+        changed = []
+        edits = 0
+        for i, pred in zip(active, preds):
+            if pred.error_probs.max(initial=0) < min_error_probability:
+                continue
+            new, count = apply_edits(sentences[i], pred, min_probability)
+            if new != sentences[i]:
+                sentences[i] = new
+                changed.append(i)
+                edits += count
+        iterations.append(CorrectionIteration(
+            iteration=n,
+            sentences=len(active),
+            edits=edits,
+            inference_ms=(time.time() - t0) * 1000,
+        ))
+        active = changed
+    return "".join(sentences), iterations
+
+
 # ─── Helpers ───────────────────────────────────────────────────────────────────
 
 
@@ -0,0 +1,125 @@
+import re
+
+import numpy as np
+import pytest
+
+import main
+from main import (
+    TokenPredictions,
+    apply_edits,
+    gector_windows,
+    split_sentences,
+    transform_word,
+    word_errors,
+)
+
+LABELS = [
+    "$KEEP",
+    "$DELETE",
+    "$REPLACE_went",
+    "$APPEND_,",
+    "$APPEND_too",
+    "$TRANSFORM_CASE_CAPITAL",
+    "$TRANSFORM_VERB_VB_VBZ",
+    "$MERGE_HYPHEN",
+]
+
+
+@pytest.fixture(autouse=True)
+def labels(monkeypatch):
+    monkeypatch.setattr(main, "gector_labels", LABELS)
+    monkeypatch.setattr(main, "gector_verb_forms", {("go", "VB_VBZ"): "goes"})
+
+
+def predict(sentence: str, edits: dict[str, tuple[str, float]]) -> TokenPredictions:
+    """One token per word; edits maps a word to (label, label probability)."""
+    spans = [m.span() for m in re.finditer(r"\S+", sentence)]
+    labels = [edits.get(sentence[s:e], ("$KEEP", 1.0)) for s, e in spans]
+    probs = np.array([p for _, p in labels])
+    return TokenPredictions(
+        offsets=spans,
+        word_ids=list(range(len(spans))),
+        label_ids=np.array([LABELS.index(label) for label, _ in labels]),
+        label_probs=probs,
+        error_probs=np.where([label != "$KEEP" for label, _ in labels], probs, 0.0),
+    )
+
+
+def test_split_sentences_round_trips():
+    text = 'He said "stop." Then left!  Why?\nNo end'
+    pieces = split_sentences(text)
+    assert "".join(pieces) == text
+    assert pieces == ['He said "stop."', " Then left!", "  Why?", "\nNo end"]
+
+
+@pytest.mark.parametrize(
+    "word, op, expected",
+    [
+        ("paris", "CASE_CAPITAL", "Paris"),
+        ("NASA", "CASE_LOWER", "nasa"),
+        ("iphone", "CASE_CAPITAL_1", "iPhone"),
+        ("cats", "AGREEMENT_SINGULAR", "cat"),
+        ("cat", "AGREEMENT_SINGULAR", None),
+        ("well-known", "SPLIT_HYPHEN", "well known"),
+        ("go", "VERB_VB_VBZ", "goes"),
+        ("run", "VERB_VB_VBZ", None),
+        ("x", "UNKNOWN", None),
+    ],
+)
+def test_transform_word(word, op, expected):
+    assert transform_word(word, op) == expected
+
+
+def test_apply_edits_rewrites_words_in_place():
+    sentence = "yesterday I goed to the the market"
+    pred = predict(
+        sentence,
+        {"yesterday": ("$TRANSFORM_CASE_CAPITAL", 0.9), "goed": ("$REPLACE_went", 0.8)},
+    )
+    # The first "the" is deleted; both share a token text, so label it by position.
+    pred.label_ids[4] = LABELS.index("$DELETE")
+    assert apply_edits(sentence, pred, 0.0) == ("Yesterday I went to the market", 3)
+
+
+def test_apply_edits_append_and_merge():
+    sentence = "Well it is a well known place"
+    pred = predict(
+        sentence,
+        {"Well": ("$APPEND_,", 0.9), "well": ("$MERGE_HYPHEN", 0.9), "place": ("$APPEND_too", 0.9)},
+    )
+    assert apply_edits(sentence, pred, 0.0) == ("Well, it is a well-known place too", 3)
+
+
+def test_apply_edits_skips_edits_below_min_probability():
+    sentence = "He go home"
+    pred = predict(sentence, {"He": ("$DELETE", 0.3), "go": ("$TRANSFORM_VERB_VB_VBZ", 0.7)})
+    assert apply_edits(sentence, pred, 0.5) == ("He goes home", 1)
+    assert apply_edits(sentence, pred, 0.8) == (sentence, 0)
+
+
+def test_word_errors_carry_message_and_suggestion():
+    text = "He go to the the market"
+    pred = predict(text, {"go": ("$TRANSFORM_VERB_VB_VBZ", 0.9), "market": ("$APPEND_,", 0.9)})
+    pred.label_ids[3] = LABELS.index("$DELETE")
+    errors = [(e.offset, e.length, e.message, e.suggestion) for e in word_errors(text, pred)]
+    assert errors == [
+        (3, 2, 'Change "go" to "goes"', "goes"),
+        (9, 3, 'Remove "the"', ""),
+        (17, 6, 'Add "," after "market"', "market,"),
+    ]
+
+
+def test_gector_windows_cover_every_token_once():
+    boundaries = [10, 25, 40, 55, 70, 90]
+    windows = gector_windows(100, boundaries, budget=40)
+    assert all(end - start <= 40 for start, _, end in windows)
+    owned = [i for _, own, end in windows for i in range(own, end)]
+    assert owned == list(range(100))
+    # Windows end on sentence boundaries and start one sentence early.
+    assert windows[0] == (0, 0, 40)
+    assert windows[1] == (25, 40, 55)
+
+
+def test_gector_windows_without_boundaries_split_at_budget():
+    assert gector_windows(70, [], budget=30) == [(0, 0, 30), (30, 30, 60), (60, 60, 70)]
+    assert gector_windows(20, [], budget=30) == [(0, 0, 20)]